@@ -1,26 +1,64 @@
 # Entry point for NBA Player Stat Viewer & Simulator
 
-import json
+import orjson
 from flask import Flask, render_template, request, abort, jsonify
+from flask_caching import Cache
+from jinja2 import FileSystemBytecodeCache
+import gzip
+import hashlib
 import os
-from basketball_sim import simulate_game
-from player_enhancer import enhance_player_data
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from models import JSON_KEYS, Player
 
 app = Flask(__name__)
 
-# Load player data from players.json
-with open(os.path.join(os.path.dirname(__file__), 'players.json'), encoding='utf-8') as f:
-    players = json.load(f)
+# Persist compiled templates so restarted workers skip the Jinja compile step
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 
-# Helper: get player by id
-def get_player(player_id):
-    for player in players:
-        if str(player['id']) == str(player_id):
-            return player
-    return None
+# In-memory response cache; players.json is static, so restart to invalidate
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+PAGE_CACHE_TIMEOUT = 3600
+
+DEFAULT_TARGET_SCORE = 11
+MIN_TARGET_SCORE = 1
+MAX_TARGET_SCORE = 100
+
+def is_post():
+    return request.method == 'POST'
+
+# API simulations (and their Gemini commentary) run here so requests return immediately;
+# results are collected by polling /api/simulate/<job_id>. The jobs only exist in this
+# process, which is why wsgi.py runs a single worker
+simulation_executor = ThreadPoolExecutor(max_workers=4)
+simulation_jobs = {}  # job id -> (future, submit time)
+simulation_jobs_lock = threading.Lock()
 
-# Helper: get team logo as SVG
-def get_team_logo(team_name):
+# Finished jobs nobody polls for are dropped after this many seconds
+SIMULATION_JOB_TTL = 600
+
+# Helper: forget finished jobs older than SIMULATION_JOB_TTL, so unpolled results don't pile up
+def evict_stale_jobs():
+    cutoff = time.monotonic() - SIMULATION_JOB_TTL
+    with simulation_jobs_lock:
+        stale = [job_id for job_id, (future, submitted) in simulation_jobs.items()
+                 if submitted < cutoff and future.done()]
+        for job_id in stale:
+            del simulation_jobs[job_id]
+
+PLAYERS_JSON = os.path.join(os.path.dirname(__file__), 'players.json')
+PLAYERS_CACHE = os.path.join(os.path.dirname(__file__), 'players.pkl')
+# Tags players.pkl with the Player schema, so a pickle built before models.py changed is rebuilt
+PLAYERS_CACHE_SCHEMA = hashlib.md5(repr(JSON_KEYS).encode()).hexdigest()
+
+# Helper: build a team's logo metadata (cached, there are only ~30 teams)
+# The SVG itself is assembled client-side from this in layout.html
+@lru_cache(maxsize=128)
+def build_team_meta(team_name):
     # Check for specific teams to use their official colors
     team_colors = {
         'New York Knicks': 'F58426',  # Knicks Orange
@@ -33,41 +71,169 @@ def get_team_logo(team_name):
     if team_name in team_colors:
         color = team_colors[team_name]
     else:
-        import hashlib
         color = hashlib.md5(team_name.encode()).hexdigest()[:6]
     
     # Get the first letter of the team name
-    first_letter = team_name[0].upper()
-    
-    # Create a simple SVG logo
-    svg = f'''
-    <svg width="50" height="50" viewBox="0 0 50 50" xmlns="http://www.w3.org/2000/svg">
-        <rect width="50" height="50" rx="25" fill="#{color}" opacity="0.8"/>
-        <text x="25" y="32" font-family="Arial, sans-serif" font-size="24" 
-              font-weight="bold" text-anchor="middle" fill="white">{first_letter}</text>
-    </svg>
-    '''
-    return svg.strip()
+    return {'color': color, 'initial': team_name[0].upper()}
+
+# Helper: parse players.json and build the lookup tables derived from it
+def load_player_data():
+    # Player.from_dict normalizes ids to strings so lookups only convert the incoming id
+    with open(PLAYERS_JSON, 'rb') as f:
+        players = [Player.from_dict(p) for p in orjson.loads(f.read())]
+    
+    # Index players by id so lookups don't scan the whole list
+    players_by_id = {p.id: p for p in players}
+    
+    # Precompute every team's metadata once, players.json fixes the set of teams
+    team_meta = {team: build_team_meta(team) for team in {p.team for p in players}}
+    
+    return players, players_by_id, team_meta
+
+# Helper: load player data from the prebuilt pickle when it's newer than players.json and
+# matches the current schema, falling back to parsing the JSON
+# (build it with `flask --app app build-player-cache`)
+def load_cached_player_data():
+    try:
+        if os.path.getmtime(PLAYERS_CACHE) >= os.path.getmtime(PLAYERS_JSON):
+            with open(PLAYERS_CACHE, 'rb') as f:
+                schema, data = pickle.load(f)
+            if schema == PLAYERS_CACHE_SCHEMA:
+                return data
+    except Exception:
+        # A missing, corrupt or outdated pickle can fail in many ways, the JSON is always safe
+        pass
+    return load_player_data()
+
+players, players_by_id, TEAM_META = load_cached_player_data()
+
+@app.cli.command('build-player-cache')
+def build_player_cache():
+    """Write players.pkl so startup skips JSON parsing and index building."""
+    with open(PLAYERS_CACHE, 'wb') as f:
+        pickle.dump((PLAYERS_CACHE_SCHEMA, load_player_data()), f, protocol=5)
+    print(f"Wrote {PLAYERS_CACHE}")
+
+# Helper: get player by id
+def get_player(player_id):
+    return players_by_id.get(str(player_id))
+
+# Helper: parse a submitted target score (a form string or a JSON number), using the default
+# if it's missing or invalid and clamping it so a huge target can't produce a pathologically long game
+def parse_target_score(raw):
+    # JSON may send a whole number as a float, e.g. 15.0
+    if isinstance(raw, float) and raw.is_integer():
+        raw = int(raw)
+    
+    if isinstance(raw, int) and not isinstance(raw, bool):
+        target_score = raw
+    elif isinstance(raw, str) and raw.removeprefix('-').isdecimal():
+        # Negative scores are valid numbers, they just get clamped below
+        try:
+            target_score = int(raw)
+        except ValueError:  # Too many digits for int()
+            target_score = DEFAULT_TARGET_SCORE
+    else:
+        target_score = DEFAULT_TARGET_SCORE
+    return min(max(target_score, MIN_TARGET_SCORE), MAX_TARGET_SCORE)
+
+# Helper: JSON response encoded with orjson rather than Flask's stdlib encoder
+def orjsonify(data, status=200):
+    return app.response_class(orjson.dumps(data), status=status, mimetype='application/json')
+
+# Pre-encoded API error responses (body, status), so error paths skip JSON encoding
+ERR_MISSING_IDS = (orjson.dumps({'error': 'Missing player IDs'}), 400)
+ERR_PLAYER_NOT_FOUND = (orjson.dumps({'error': 'Player not found'}), 404)
+ERR_SIMULATION_NOT_FOUND = (orjson.dumps({'error': 'Simulation not found'}), 404)
+ERR_SIMULATION_FAILED = (orjson.dumps({'error': 'Simulation failed'}), 500)
+
+# Helper: response for one of the pre-encoded API errors
+def api_error(error):
+    body, status = error
+    return app.response_class(body, status=status, mimetype='application/json')
+
+# Helper: get team logo metadata, served from the precomputed table
+def get_team_meta(team_name):
+    return TEAM_META.get(team_name) or build_team_meta(team_name)
 
 # Register the function to be available in templates
-app.jinja_env.globals.update(get_team_logo=get_team_logo)
+app.jinja_env.globals['get_team_meta'] = get_team_meta
+
+# Helper: version tag for pages built only from players.json and the templates,
+# so repeat visitors can be answered with 304 Not Modified
+def compute_pages_etag():
+    digest = hashlib.md5()
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    for path in [PLAYERS_JSON] + sorted(os.path.join(template_dir, name) for name in os.listdir(template_dir)):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+PAGES_ETAG = compute_pages_etag()
+
+# Helper: 304 response when the client already has this version of the page, else None
+def not_modified(etag):
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+# Helper: render a page once, keeping both the plain and gzipped bytes
+def prerender_page(template_name, **context):
+    body = render_template(template_name, **context).encode('utf-8')
+    return body, gzip.compress(body)
+
+# Helper: serve a prerendered page, gzipped when the client accepts it
+def prerendered_response(page):
+    body, gzipped = page
+    # Index for the quality rather than using 'in', which ignores q-values such as gzip;q=0
+    use_gzip = request.accept_encodings['gzip'] > 0
+    etag = f'{PAGES_ETAG}-gzip' if use_gzip else PAGES_ETAG
+    
+    response = not_modified(etag)
+    if response is None:
+        if use_gzip:
+            response = app.response_class(gzipped, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = app.response_class(body, mimetype='text/html')
+        response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Compile templates at startup instead of on the first request to each page
+with app.app_context():
+    for template_name in ('layout.html', 'home.html', 'players.html', 'player_detail.html',
+                          'compare.html', 'simulate.html'):
+        app.jinja_env.get_template(template_name)
+    
+    # These pages only change with players.json, so render them once per process
+    HOME_PAGE = prerender_page('home.html')
+    PLAYERS_PAGE = prerender_page('players.html', players=players)
 
 @app.route('/')
 def home():
-    return render_template('home.html')
+    return prerendered_response(HOME_PAGE)
 
 @app.route('/players')
 def list_players():
-    return render_template('players.html', players=players)
+    return prerendered_response(PLAYERS_PAGE)
 
 @app.route('/player/<player_id>')
 def player_detail(player_id):
     player = get_player(player_id)
     if not player:
         abort(404)
-    return render_template('player_detail.html', player=player)
+    
+    response = not_modified(PAGES_ETAG)
+    if response is None:
+        response = app.make_response(render_template('player_detail.html', player=player))
+        response.set_etag(PAGES_ETAG)
+    return response
 
 @app.route('/compare', methods=['GET', 'POST'])
+@cache.cached(timeout=PAGE_CACHE_TIMEOUT, unless=is_post)
 def compare():
     result = None
     if request.method == 'POST':
@@ -80,10 +246,11 @@ def compare():
     return render_template('compare.html', players=players, result=result)
 
 @app.route('/simulate', methods=['GET', 'POST'])
+@cache.cached(timeout=PAGE_CACHE_TIMEOUT, unless=is_post)
 def simulate():
     sim_result = None
     ai_commentary = None
-    target_score = 11  # Default target score
+    target_score = DEFAULT_TARGET_SCORE
     
     if request.method == 'POST':
         id1 = request.form.get('player1')
@@ -92,19 +259,21 @@ def simulate():
         p2 = get_player(id2)
         
         # Get target score if provided
-        if request.form.get('target_score'):
-            try:
-                target_score = int(request.form.get('target_score'))
-            except ValueError:
-                pass  # Use default if invalid
+        target_score = parse_target_score(request.form.get('target_score'))
         
         if p1 and p2:
-            # Run the advanced simulation
-            game_result = simulate_game(p1, p2, target_score=target_score)
+            # Imported here so workers that never simulate don't pay for the Gemini client
+            from basketball_sim import simulate_game
+            
+            p1_name = p1.name
+            
+            # Run the advanced simulation (the simulator works on plain stat dicts)
+            game_result = simulate_game(p1.to_dict(), p2.to_dict(), target_score=target_score)
             
-            # Extract winner from game result
+            # Extract winner from game result (names aren't unique in players.json,
+            # so compare against the two players in this game rather than indexing by name)
             winner_name = game_result.get('winner')
-            winner = p1 if winner_name == p1['name'] else p2
+            winner = (p2, p1)[winner_name == p1_name]
             
             # Get enhanced player data from the simulation
             enhanced_p1 = game_result.get('enhanced_player1', p1)
@@ -130,43 +299,71 @@ def get_ai_commentary():
     """This function is now deprecated as commentary is generated in the simulation"""
     return 'AI commentary is now generated as part of the simulation.'
 
-# API endpoint to get simulation results as JSON
+# API endpoint to start a simulation; returns a job id to poll for the JSON result
 @app.route('/api/simulate', methods=['POST'])
 def api_simulate():
     data = request.json
     if not data or 'player1_id' not in data or 'player2_id' not in data:
-        return jsonify({'error': 'Missing player IDs'}), 400
+        return api_error(ERR_MISSING_IDS)
     
     p1 = get_player(data['player1_id'])
     p2 = get_player(data['player2_id'])
     
     if not p1 or not p2:
-        return jsonify({'error': 'Player not found'}), 404
+        return api_error(ERR_PLAYER_NOT_FOUND)
     
-    target_score = data.get('target_score', 11)
+    target_score = parse_target_score(data.get('target_score'))
     
-    # Run simulation with enhanced player data
-    game_result = simulate_game(p1, p2, target_score=target_score)
+    # Run simulation with enhanced player data in the background
+    from basketball_sim import simulate_game
+    evict_stale_jobs()
+    job_id = uuid.uuid4().hex
+    future = simulation_executor.submit(simulate_game, p1.to_dict(), p2.to_dict(), target_score=target_score)
+    with simulation_jobs_lock:
+        simulation_jobs[job_id] = (future, time.monotonic())
     
-    return jsonify(game_result)
+    return orjsonify({'job_id': job_id, 'status': 'pending'}, status=202)
+
+# API endpoint to poll a simulation started by /api/simulate
+@app.route('/api/simulate/<job_id>')
+def api_simulate_result(job_id):
+    evict_stale_jobs()
+    with simulation_jobs_lock:
+        job = simulation_jobs.get(job_id)
+        if job is not None and job[0].done():
+            # Results are handed out once, then the job is forgotten
+            del simulation_jobs[job_id]
+    if job is None:
+        return api_error(ERR_SIMULATION_NOT_FOUND)
+    
+    future = job[0]
+    if not future.done():
+        return orjsonify({'job_id': job_id, 'status': 'pending'}, status=202)
+    
+    try:
+        game_result = future.result()
+    except Exception:
+        app.logger.exception("Error running simulation %s", job_id)
+        return api_error(ERR_SIMULATION_FAILED)
+    
+    return orjsonify({'job_id': job_id, 'status': 'done', 'result': game_result})
 
 # SQL Injection demonstration endpoint (for educational purposes only)
+# WARNING: This query template is intentionally vulnerable to SQL injection
+# DO NOT use this pattern in production code
+ERROR_TEST_QUERY = "SELECT * FROM users WHERE username = '{}'"
+ERROR_TEST_NOTES = {
+    'warning': 'This endpoint demonstrates SQL injection vulnerability. DO NOT use this pattern in production.',
+    'proper_way': 'Use parameterized queries instead: cursor.execute("SELECT * FROM users WHERE username = ?", (username,))'
+}
+
 @app.route('/error_test')
 def error_test():
     username = request.args.get('username', '')
     
-    # WARNING: This is intentionally vulnerable to SQL injection
-    # DO NOT use this pattern in production code
-    query = f"SELECT * FROM users WHERE username = '{username}'"
-    
     # We're not actually executing the query, just showing it
-    result = {
-        'query': query,
-        'warning': 'This endpoint demonstrates SQL injection vulnerability. DO NOT use this pattern in production.',
-        'proper_way': 'Use parameterized queries instead: cursor.execute("SELECT * FROM users WHERE username = ?", (username,))'
-    }
-    
-    return jsonify(result)
+    return jsonify({'query': ERROR_TEST_QUERY.format(username), **ERROR_TEST_NOTES})
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only; see wsgi.py for running under gunicorn
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -6,17 +6,326 @@ using their statistics and the Gemini API for generating play-by-play commentary
 Enhanced with derived player attributes for more realistic gameplay.
 """
 
-import random
-import json
+import asyncio
+import orjson
+import array
+import io
+import re
+import os
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
 import google.generativeai as genai
 from config import GEMINI_API_KEY
 from player_enhancer import enhance_player_data
+from sim_core import (
+    FG_PCT, THREE_PT_PCT, THREE_PT_TENDENCY, HEIGHT, OFF_RATING, DEF_RATING,
+    BLOCKS, STEALS, TURNOVERS, STAMINA, INSIDE_ODDS, OFF_REBOUNDS, DEF_REBOUNDS, CLUTCH, N_FEATURES,
+    EVT_TURNOVER, EVT_SHOT_MADE, EVT_STEAL, EVT_BLOCK, EVENT_KIND, EVENT_OFFENSE, EVENT_OUTSIDE,
+    run_game, run_games_scores, play_possession, possession_tables, shot_probability_table,
+    seed as seed_kernel_rng
+)
 
 # Configure the Gemini API
 genai.configure(api_key=GEMINI_API_KEY)
 
+# Gemini responses are saved here so replaying an identical game doesn't call the API again
+GEMINI_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.gemini_cache')
+# Unseeded games rarely repeat a prompt, so only the most recently written responses are kept
+GEMINI_CACHE_MAX_FILES = 1000
+
+# The part of the commentary prompt that is the same for every game. It is sent as the
+# model's system instruction, so each request only carries the players, rules and game log
+COMMENTARY_MODEL = 'gemini-1.5-flash'
+COMMENTARY_INSTRUCTIONS = """
+You are a basketball commentator providing play-by-play commentary for a 1-on-1 basketball game.
+
+Please provide an engaging, detailed play-by-play commentary of this game, highlighting key moments,
+player strengths/weaknesses, and tactical decisions. Make it sound like an exciting broadcast.
+
+Format your response with the following requirements:
+1. Use HTML formatting for better readability
+2. DO NOT use headings like "Game Summary", "Introduction:", etc. at the beginning of the commentary
+3. Start directly with the play-by-play narrative without any headers
+4. Use <h3> tags only for meaningful section headings if needed (First Half, Second Half, etc.)
+5. Use <p> tags for paragraphs
+6. Use <strong> or <b> tags to emphasize important moments, player names, and scores
+7. Use <br> tags for line breaks within paragraphs where appropriate
+8. Create a clear structure with game progression and conclusion
+9. Include statistics and highlight key plays in a visually distinct way
+10. For the final score, make it stand out with bold formatting
+
+Include an introduction, the play-by-play narrative organized by game progression, and a conclusion with the final result.
+"""
+
+# Keys the response cache, so changing the model or instructions doesn't reuse old responses
+_COMMENTARY_CACHE_KEY = hashlib.blake2b((COMMENTARY_MODEL + COMMENTARY_INSTRUCTIONS).encode()).digest()
+
+# Last chunk of a commentary stream that Gemini cut off partway through
+COMMENTARY_INTERRUPTED = '<p class="commentary-error"><em>The commentary was cut off before the end of the game.</em></p>'
+
+# Player dict key and default value behind each column of BasketballSimulator.stats
+# (INSIDE_ODDS is computed from position and 3P% instead)
+_STAT_KEYS = (
+    (FG_PCT, 'Field Goal Percentage (FG%)', 45),
+    (THREE_PT_PCT, 'Three-Point Percentage (3P%)', 33),
+    (THREE_PT_TENDENCY, 'three_point_tendency', 0.3),
+    (HEIGHT, 'height_inches', 72),
+    (OFF_RATING, 'offensive_rating', 50),
+    (DEF_RATING, 'defensive_rating', 50),
+    (BLOCKS, 'estimated_blocks', 0.5),
+    (STEALS, 'estimated_steals', 0.8),
+    (TURNOVERS, 'Turnovers Per Game (TOV)', 2.0),
+    (STAMINA, 'stamina', 1.0),
+    (OFF_REBOUNDS, 'offensive_rebounds', 2),
+    (DEF_REBOUNDS, 'defensive_rebounds', 5),
+    (CLUTCH, 'clutch_rating', 0.5),
+)
+
+# Base chance of taking an inside shot by position; guards and wings take more outside shots
+_INSIDE_SHOT_ODDS = {'PG': 0.5, 'SG': 0.5, 'SF': 0.5}
+_DEFAULT_INSIDE_SHOT_ODDS = 0.7
+
+# Commentary phrase pools; {shooter} and {defender} are filled in with player names
+_INSIDE_MOVES = (
+    "drives to the basket",
+    "makes a quick move to the hoop",
+    "backs down in the post",
+    "spins into the lane",
+    "cuts to the basket",
+    "goes up strong",
+    "attempts a layup",
+    "tries a floater",
+    "goes for a post move"
+)
+
+_OUTSIDE_MOVES = (
+    "pulls up for a deep shot",
+    "steps back for a jumper",
+    "creates space for a jump shot",
+    "rises up for the long-range shot",
+    "attempts a perimeter shot",
+    "goes for a fadeaway jumper"
+)
+
+_DEFENSIVE_ACTIONS = (
+    "with {defender} contesting",
+    "against tight defense from {defender}",
+    "with {defender} right there",
+    "over {defender}"
+)
+
+_SUCCESS_PHRASES = (
+    "... and it's good!",
+    "... it drops in!",
+    "... nothing but net!",
+    "... count it!",
+    "... and scores!",
+    "... and converts!"
+)
+
+_MISS_PHRASES = (
+    "... but misses!",
+    "... off the rim!",
+    "... but it's no good!",
+    "... but can't connect!",
+    "... but it rims out!"
+)
+
+_TURNOVER_PHRASES = (
+    "{shooter} loses control of the ball and turns it over.",
+    "{shooter} steps out of bounds, turning the ball over.",
+    "{shooter} makes a bad pass that goes out of bounds.",
+    "{shooter} is called for traveling, turning the ball over."
+)
+
+_INSIDE_BLOCK_PHRASES = (
+    "{shooter} goes up for the shot, but {defender} BLOCKS it emphatically!",
+    "{defender} meets {shooter} at the rim and rejects the shot!",
+    "Great defense! {defender} swats away {shooter}'s attempt!",
+    "{shooter} drives in but {defender} times it perfectly for the block!"
+)
+
+_OUTSIDE_BLOCK_PHRASES = (
+    "{shooter} pulls up, but {defender} gets a piece of it!",
+    "{defender} closes out quickly and blocks {shooter}'s jumper!",
+    "Great perimeter defense! {defender} blocks the shot attempt!",
+    "{shooter}'s shot is rejected by {defender}!"
+)
+
+
+@lru_cache(maxsize=None)
+def _commentary_model():
+    """Return the Gemini model used for commentary, created once and reused."""
+    return genai.GenerativeModel(COMMENTARY_MODEL, system_instruction=COMMENTARY_INSTRUCTIONS)
+
+
+def _cached_response_path(prompt):
+    """Return where the Gemini response for a prompt is cached on disk."""
+    return os.path.join(GEMINI_CACHE_DIR, hashlib.blake2b(prompt.encode(), key=_COMMENTARY_CACHE_KEY).hexdigest() + '.txt')
+
+
+def _read_cached_response(path):
+    """Return a cached Gemini response, or None if there isn't one."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cached_response(path, text):
+    """Save a Gemini response to the disk cache."""
+    # Write to a temporary file first so a concurrent reader never sees a partial response
+    os.makedirs(GEMINI_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{id(text)}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    _evict_cached_responses()
+
+
+def _save_cached_response(path, text):
+    """Best-effort _write_cached_response: a failed write is logged, since the response is still usable."""
+    try:
+        _write_cached_response(path, text)
+    except OSError as e:
+        print(f"Error caching Gemini response: {e}")
+
+
+def _evict_cached_responses():
+    """Delete the oldest cached responses so the disk cache holds at most GEMINI_CACHE_MAX_FILES."""
+    with os.scandir(GEMINI_CACHE_DIR) as entries:
+        cached = [(entry.stat().st_mtime, entry.path) for entry in entries if entry.name.endswith('.txt')]
+    if len(cached) > GEMINI_CACHE_MAX_FILES:
+        cached.sort()
+        for _, path in cached[:-GEMINI_CACHE_MAX_FILES]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # Another worker evicted it first
+                pass
+
+
+@lru_cache(maxsize=128)
+def _gemini(prompt):
+    """
+    Generate text for a prompt with Gemini, reusing earlier responses.
+    
+    Responses are kept in memory and on disk under GEMINI_CACHE_DIR, keyed by
+    a hash of the prompt, model and instructions. API errors are not cached, and
+    a failed cache write only loses the disk copy.
+    
+    Args:
+        prompt: The full prompt text
+    
+    Returns:
+        The response text
+    """
+    path = _cached_response_path(prompt)
+    text = _read_cached_response(path)
+    if text is None:
+        text = _commentary_model().generate_content(prompt).text
+        _save_cached_response(path, text)
+    return text
+
+
+async def _gemini_async(prompt):
+    """Async version of _gemini, which waits on the API without blocking the event loop (disk cache only)."""
+    path = _cached_response_path(prompt)
+    text = await asyncio.to_thread(_read_cached_response, path)
+    if text is None:
+        response = await _commentary_model().generate_content_async(prompt)
+        text = response.text
+        await asyncio.to_thread(_save_cached_response, path, text)
+    return text
+
+
+async def _gemini_stream(prompt):
+    """
+    Async generator version of _gemini_async, which yields the response text as it arrives.
+    
+    A cached response is yielded in one piece; a fresh one is cached once it has fully arrived.
+    """
+    path = _cached_response_path(prompt)
+    text = await asyncio.to_thread(_read_cached_response, path)
+    if text is not None:
+        yield text
+        return
+    
+    chunks = []
+    response = await _commentary_model().generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        chunks.append(chunk.text)
+        yield chunk.text
+    # Caching is best-effort, so a failed write can't make a complete stream look interrupted
+    await asyncio.to_thread(_save_cached_response, path, ''.join(chunks))
+
+
+@dataclass(frozen=True, slots=True)
+class LogEntry:
+    """One line of a game's play-by-play log."""
+    type: str
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerStats:
+    """Derived simulation stats for a player."""
+    offensive_rating: float
+    defensive_rating: float
+    steals_per_game: float
+    blocks_per_game: float
+    turnovers_per_game: float
+    
+    def as_player_fields(self):
+        """Return the stats keyed the way the simulator reads them from player dicts."""
+        return {
+            'offensive_rating': self.offensive_rating,
+            'defensive_rating': self.defensive_rating,
+            'Steals Per Game (SPG)': self.steals_per_game,
+            'Blocks Per Game (BPG)': self.blocks_per_game,
+            'Turnovers Per Game (TOV)': self.turnovers_per_game,
+        }
+
+
+@lru_cache(maxsize=1024)
+def _derive_stats(height_inches, points, scoring_efficiency, usage_rate, defensive_impact, steals, blocks, turnovers):
+    """Calculate derived stats from hashable inputs, so repeat matchups reuse the result."""
+    # Calculate offensive rating (enhanced version using derived stats)
+    offensive_rating = points * 0.3 + scoring_efficiency * 0.4 + usage_rate * 0.3
+    
+    # Calculate defensive rating (enhanced version using derived stats)
+    defensive_rating = defensive_impact * 0.6 + height_inches / 84 * 40  # Normalize height impact
+    
+    return PlayerStats(offensive_rating, defensive_rating, steals, blocks, turnovers)
+
+
+def _derive_player_stats(player):
+    """Look up the derived stats for an enhanced player dict."""
+    return _derive_stats(
+        player.get('height_inches', 72),
+        player.get('points', 10),
+        player.get('scoring_efficiency', 45),
+        player.get('usage_rate', 20),
+        player.get('defensive_impact', 5),
+        # Handle missing stats with reasonable defaults
+        player.get('Steals Per Game (SPG)', player.get('estimated_steals', 0.8)),
+        player.get('Blocks Per Game (BPG)', player.get('estimated_blocks', 0.5)),
+        player.get('Turnovers Per Game (TOV)', 2.0),  # League average
+    )
+
 class BasketballSimulator:
-    def __init__(self, player1, player2, target_score=11, make_it_take_it=True):
+    # One simulator is created per game, so avoid a per-instance __dict__
+    __slots__ = (
+        'player1', 'player2', 'target_score', 'make_it_take_it', 'narrate', 'log_sample_rate', '_log_acc',
+        'players', 'score', 'possession_idx', 'game_log', 'game_over', 'winner',
+        'p1_stats', 'p2_stats', 'stats', 'shot_probs', 'turnover_probs', 'block_probs',
+        'rebound_probs', 'shot_factors', 'players_json', '_intro_prefix', '_rng'
+    )
+    
+    def __init__(self, player1, player2, target_score=11, make_it_take_it=True, narrate=True, log_sample_rate=1.0,
+                 seed=None):
         """
         Initialize the basketball simulator with two players.
         
@@ -25,455 +334,343 @@ class BasketballSimulator:
             player2: Dictionary containing player 2's stats
             target_score: Points needed to win (default: 11)
             make_it_take_it: If True, scorer keeps possession (default: True)
+            narrate: If False, simulate_full_game skips the play-by-play text and logs
+                (event code, offense index, points) tuples instead (default: True)
+            log_sample_rate: Share of events kept in the game log, for bulk runs that only
+                need the result (default: 1.0, keep everything)
+            seed: Optional seed for the simulator's random generator, so its games can be
+                reproduced (default: None, seeded from the OS)
         """
         # Enhance player data with derived attributes
         self.player1 = enhance_player_data(player1)
         self.player2 = enhance_player_data(player2)
+        self.players = (self.player1, self.player2)  # Indexed like the rows of self.stats
         self.target_score = target_score
         self.make_it_take_it = make_it_take_it
+        self.narrate = narrate
+        self.log_sample_rate = log_sample_rate
+        self.players_json = None  # Serialized for the commentary prompt on first use
+        # NumPy's PCG64 generator is faster than random's Mersenne Twister and draws in bulk
+        self._rng = np.random.default_rng(seed)
+        
+        # Everything in the intro except who wins the tip is the same for every game
+        self._intro_prefix = (
+            f"Welcome to this 1v1 showdown between {self.player1['name']} and {self.player2['name']}! "
+            f"First to {self.target_score} points wins, and we're playing {'make it, take it' if self.make_it_take_it else 'alternating possession'} rules. "
+        )
         
         # Game state
-        self.score = {player1['name']: 0, player2['name']: 0}
-        self.possession = None  # Will be set when game starts
-        self.game_log = []
-        self.game_over = False
-        self.winner = None
+        self._reset()
         
         # Calculate additional derived stats that might be useful
         self._calculate_derived_stats()
     
     def _calculate_derived_stats(self):
         """Calculate additional stats that might be useful for simulation."""
-        for player in [self.player1, self.player2]:
-            # Convert height to inches for easier comparison
-            height_str = player.get('height', '6\'0"')
-            feet, inches = height_str.replace('"', '').split("'")
-            player['height_inches'] = int(feet) * 12 + int(inches) if inches else int(feet) * 12
-            
-            # Calculate offensive rating (enhanced version using derived stats)
-            player['offensive_rating'] = (
-                player.get('points', 10) * 0.3 + 
-                player.get('scoring_efficiency', 45) * 0.4 +
-                player.get('usage_rate', 20) * 0.3
-            )
-            
-            # Calculate defensive rating (enhanced version using derived stats)
-            player['defensive_rating'] = (
-                player.get('defensive_impact', 5) * 0.6 + 
-                player.get('height_inches', 72) / 84 * 40  # Normalize height impact
-            )
-            
-            # Handle missing stats with reasonable defaults
-            if 'Steals Per Game (SPG)' not in player:
-                player['Steals Per Game (SPG)'] = player.get('estimated_steals', 0.8)
-            if 'Blocks Per Game (BPG)' not in player:
-                player['Blocks Per Game (BPG)'] = player.get('estimated_blocks', 0.5)
-            if 'Turnovers Per Game (TOV)' not in player:
-                player['Turnovers Per Game (TOV)'] = 2.0  # League average
-    
-    def start_game(self):
-        """Start the game by determining initial possession."""
-        # Determine who starts with the ball (50/50 chance)
-        self.possession = random.choice([self.player1, self.player2])
+        self.p1_stats = _derive_player_stats(self.player1)
+        self.p2_stats = _derive_player_stats(self.player2)
         
-        # Log the game start
-        intro = f"Welcome to this 1v1 showdown between {self.player1['name']} and {self.player2['name']}! "
-        intro += f"First to {self.target_score} points wins, and we're playing {'make it, take it' if self.make_it_take_it else 'alternating possession'} rules. "
-        intro += f"{self.possession['name']} wins the tip and will start with the ball."
+        # Expose the derived stats on the player dicts for the game loop, display and commentary
+        self.player1.update(self.p1_stats.as_player_fields())
+        self.player2.update(self.p2_stats.as_player_fields())
         
-        self.game_log.append({"type": "intro", "text": intro})
-        return intro
+        # Pack the numbers the probability calculations need into one array (row 0 = player 1)
+        self.stats = np.array([self._stat_row(self.player1), self._stat_row(self.player2)])
+        # The matchup is fixed, so every shot probability can be worked out up front
+        self.shot_probs = shot_probability_table(self.stats)
+        
+        # Same for the turnover, block and rebound chances and the clutch/stamina factors
+        (self.turnover_probs, self.block_probs,
+         self.rebound_probs, self.shot_factors) = possession_tables(self.stats)
+    
+    def _stat_row(self, player):
+        """Return a player's simulation numbers in the column order of self.stats."""
+        row = np.empty(N_FEATURES)
+        for column, key, default in _STAT_KEYS:
+            row[column] = player.get(key, default)
+        row[INSIDE_ODDS] = self._get_inside_shot_odds(player)  # Encodes position and 3P%
+        return row
     
-    def _get_shot_success_probability(self, offensive_player, defensive_player, shot_type):
+    def _reset(self, first_offense=None):
         """
-        Calculate the probability of a successful shot.
+        Clear the game state, so one simulator can play several games.
         
         Args:
-            offensive_player: Player taking the shot
-            defensive_player: Player defending
-            shot_type: Either 'inside' (1-pointer) or 'outside' (2-pointer)
+            first_offense: Index into self.players of the player who starts with the ball;
+                when given, the game's introduction is logged
         
         Returns:
-            Float representing probability (0-1) of shot success
+            The introduction text, or None if no game was started
         """
-        # Base probability from shooting percentages and derived stats
-        if shot_type == 'inside':
-            # Inside shots use FG% as base
-            base_probability = offensive_player.get('Field Goal Percentage (FG%)', 45) / 100
-            # Adjust for height advantage/disadvantage
-            height_factor = 1 + (offensive_player.get('height_inches', 72) - 
-                                defensive_player.get('height_inches', 72)) / 100
-            base_probability *= height_factor
-        else:  # outside shot
-            # Outside shots use 3P% as base and consider three_point_tendency
-            base_probability = offensive_player.get('Three-Point Percentage (3P%)', 33) / 100
-            # Players who take more threes tend to be better at them in game situations
-            tendency_bonus = offensive_player.get('three_point_tendency', 0.3) * 0.1
-            base_probability += tendency_bonus
-        
-        # Adjust for offensive vs defensive ratings
-        offensive_rating = offensive_player.get('offensive_rating', 50)
-        defensive_rating = defensive_player.get('defensive_rating', 50)
-        rating_factor = 1 + (offensive_rating - defensive_rating) / 200
-        
-        # Adjust for defensive impact specifically for this shot type
-        if shot_type == 'inside':
-            defense_impact = defensive_player.get('estimated_blocks', 0.5) * 0.05
-        else:
-            defense_impact = defensive_player.get('estimated_steals', 0.8) * 0.03
+        self.score = array.array('i', [0, 0])  # Indexed like self.players
+        self.possession_idx = first_offense  # Index into self.players, set when game starts
+        self.game_log = []
+        self._log_acc = 0.0
+        self.game_over = False
+        self.winner = None
+        if first_offense is None:
+            return None
         
-        # Calculate final probability
-        final_probability = base_probability * rating_factor - defense_impact
+        # Log the game start
+        intro = f"{self._intro_prefix}{self.players[first_offense]['name']} wins the tip and will start with the ball."
+        self._log(LogEntry("intro", intro))
+        return intro
+    
+    def start_game(self):
+        """Start the game by determining initial possession."""
+        # Determine who starts with the ball (50/50 chance)
+        first_offense = int(self._rng.integers(2))
+        # Seed the possession kernel from our generator so a seeded simulator reproduces the game
+        seed_kernel_rng(int(self._rng.integers(2**32)))
+        return self._reset(first_offense)
+    
+    def _get_inside_shot_odds(self, player):
+        """Return the chance that a player takes an inside (rather than outside) shot."""
+        shot_type_odds = _INSIDE_SHOT_ODDS.get(player['position'], _DEFAULT_INSIDE_SHOT_ODDS)
+        
+        # Adjust based on three-point percentage
+        three_pt_pct = player.get('Three-Point Percentage (3P%)', 30.0)
+        if three_pt_pct > 35:  # Good three-point shooters
+            shot_type_odds -= 0.1
         
-        # Clamp to reasonable range
-        return max(0.1, min(0.9, final_probability))
+        return shot_type_odds
     
     def _simulate_possession(self):
         """Simulate a single possession in the game."""
-        offensive_player = self.possession
-        defensive_player = self.player2 if offensive_player == self.player1 else self.player1
-        
-        # Determine if there's a turnover
-        turnover_chance = offensive_player.get('Turnovers Per Game (TOV)', 2.0) / 15
-        steal_chance = defensive_player.get('estimated_steals', 0.8) / 10
-        
-        if random.random() < (turnover_chance + steal_chance):
-            # Turnover occurred
-            if random.random() < (steal_chance / (turnover_chance + steal_chance)):
-                # It was a steal
-                turnover_text = f"{defensive_player['name']} steals the ball from {offensive_player['name']}!"
-            else:
-                # It was an unforced turnover
-                turnover_options = [
-                    f"{offensive_player['name']} loses control of the ball and turns it over.",
-                    f"{offensive_player['name']} steps out of bounds, turning the ball over.",
-                    f"{offensive_player['name']} makes a bad pass that goes out of bounds.",
-                    f"{offensive_player['name']} is called for traveling, turning the ball over."
-                ]
-                turnover_text = random.choice(turnover_options)
-            
-            self.game_log.append({"type": "turnover", "text": turnover_text})
-            
-            # Change possession
-            self.possession = defensive_player
-            return
+        off_idx = self.possession_idx
+        def_idx = 1 - off_idx
+        offensive_player = self.players[off_idx]
+        defensive_player = self.players[def_idx]
+        # Each name is used several times below, so look them up once
+        offense_name = offensive_player['name']
+        defense_name = defensive_player['name']
+        
+        # Play the possession in the compiled core, then describe what happened
+        kind, outside, self.possession_idx = play_possession(
+            self.stats, self.shot_probs, self.turnover_probs, self.block_probs, self.rebound_probs,
+            self.shot_factors, off_idx, self.score[off_idx], self.score[def_idx], self.target_score,
+            self.make_it_take_it
+        )
+        shot_type = 'outside' if outside else 'inside'
         
-        # Determine shot type (inside or outside) using three_point_tendency
-        outside_shot_chance = offensive_player.get('three_point_tendency', 0.3)
-            
-        shot_type = 'outside' if random.random() < outside_shot_chance else 'inside'
-        
-        # Determine if shot is blocked
-        block_chance = 0
-        if shot_type == 'inside':
-            # Inside shots can be blocked
-            block_chance = defensive_player.get('estimated_blocks', 0.5) / 10
-            # Height advantage increases block chance
-            if defensive_player.get('height_inches', 72) > offensive_player.get('height_inches', 72):
-                height_diff = defensive_player.get('height_inches', 72) - offensive_player.get('height_inches', 72)
-                block_chance += height_diff / 200
-        
-        if random.random() < block_chance:
-            # Shot is blocked
-            block_text = self._generate_block_description(offensive_player, defensive_player, shot_type)
-            self.game_log.append({"type": "block", "text": block_text})
-            
-            # 50% chance the blocker gains possession, otherwise ball stays with shooter
-            if random.random() < 0.5:
-                self.possession = defensive_player
-            
+        if kind == EVT_STEAL:
+            turnover_text = f"{defense_name} steals the ball from {offense_name}!"
+            self._log(LogEntry("turnover", turnover_text))
             return
         
-        # Calculate shot success probability
-        success_prob = self._get_shot_success_probability(offensive_player, defensive_player, shot_type)
-        
-        # Adjust for clutch situations (close game in late stages)
-        score_diff = abs(self.score[offensive_player['name']] - self.score[defensive_player['name']])
-        close_game = score_diff <= 2
-        near_end = max(self.score[offensive_player['name']], self.score[defensive_player['name']]) >= (self.target_score - 3)
-        
-        if close_game and near_end:
-            # Clutch situation - adjust based on clutch_rating
-            clutch_factor = offensive_player.get('clutch_rating', 0.5) * 0.2
-            success_prob = success_prob * (1 + clutch_factor)
-        
-        # Adjust for stamina
-        stamina_factor = offensive_player.get('stamina', 1.0) * 0.1
-        success_prob = success_prob * (0.95 + stamina_factor)
+        if kind == EVT_TURNOVER:
+            turnover_text = _TURNOVER_PHRASES[self._rng.integers(len(_TURNOVER_PHRASES))].format(shooter=offense_name)
+            self._log(LogEntry("turnover", turnover_text))
+            return
         
-        # Determine if shot is successful
-        shot_successful = random.random() < success_prob
+        if kind == EVT_BLOCK:
+            block_text = self._generate_block_description(offensive_player, defensive_player, shot_type)
+            self._log(LogEntry("block", block_text))
+            return
         
         # Generate description of the shot
+        shot_successful = kind == EVT_SHOT_MADE
         shot_description = self._generate_shot_description(
             offensive_player, defensive_player, shot_type, shot_successful
         )
         
         # Log the shot
         shot_type_log = "shot_made" if shot_successful else "shot_missed"
-        self.game_log.append({"type": shot_type_log, "text": shot_description})
+        self._log(LogEntry(shot_type_log, shot_description))
         
         if shot_successful:
             # Update score
-            points = 2 if shot_type == 'outside' else 1
-            self.score[offensive_player['name']] += points
+            points = 2 if outside else 1
+            self.score[off_idx] += points
             
             # Check if game is over
-            if self.score[offensive_player['name']] >= self.target_score:
+            if self.score[off_idx] >= self.target_score:
                 self.game_over = True
-                self.winner = offensive_player['name']
+                self.winner = offense_name
                 
                 # Generate conclusion text
-                conclusion = f"Game over! {offensive_player['name']} wins {self.score[offensive_player['name']]}-{self.score[defensive_player['name']]}!"
-                self.game_log.append({"type": "conclusion", "text": conclusion})
-            
-            # If make-it-take-it rules, offensive player keeps possession
-            if not self.make_it_take_it:
-                self.possession = defensive_player
+                conclusion = f"Game over! {offense_name} wins {self.score[off_idx]}-{self.score[def_idx]}!"
+                self._log(LogEntry("conclusion", conclusion))
+        elif self.possession_idx == off_idx:
+            rebound_text = f"{offense_name} grabs their own miss!"
+            self._log(LogEntry("rebound", rebound_text))
         else:
-            # Shot missed, determine who gets the rebound using derived offensive/defensive rebound stats
-            if shot_type == 'inside':
-                # Inside shots have different rebound dynamics
-                off_rebound_chance = offensive_player.get('offensive_rebounds', 2) / (
-                    offensive_player.get('offensive_rebounds', 2) + 
-                    defensive_player.get('defensive_rebounds', 5)
-                )
-            else:
-                # Outside shots tend to have longer rebounds
-                off_rebound_chance = offensive_player.get('offensive_rebounds', 1) / (
-                    offensive_player.get('offensive_rebounds', 1) + 
-                    defensive_player.get('defensive_rebounds', 4) * 1.2
-                )
-            
-            # Adjust for height
-            height_advantage = (offensive_player.get('height_inches', 72) - 
-                               defensive_player.get('height_inches', 72)) / 100
-            off_rebound_chance += height_advantage
-            
-            # Clamp to reasonable range
-            off_rebound_chance = max(0.2, min(0.8, off_rebound_chance))
-            
-            if random.random() < off_rebound_chance:
-                # Offensive rebound
-                rebound_text = f"{offensive_player['name']} grabs their own miss!"
-                self.game_log.append({"type": "rebound", "text": rebound_text})
-                # Possession stays with offensive player
-            else:
-                # Defensive rebound
-                rebound_text = f"{defensive_player['name']} secures the defensive rebound."
-                self.game_log.append({"type": "rebound", "text": rebound_text})
-                # Change possession
-                self.possession = defensive_player
-    
-    def _generate_shot_description(self, offensive_player, defensive_player, shot_type, successful):
-        """Generate a descriptive text for a shot attempt."""
-        # Shot type descriptions
-        inside_moves = [
-            "drives to the basket",
-            "makes a quick move to the hoop",
-            "backs down in the post",
-            "spins into the lane",
-            "cuts to the basket",
-            "goes up strong",
-            "attempts a layup",
-            "tries a floater",
-            "goes for a post move"
-        ]
-        
-        outside_moves = [
-            "pulls up for a deep shot",
-            "steps back for a jumper",
-            "creates space for a jump shot",
-            "rises up for the long-range shot",
-            "attempts a perimeter shot",
-            "goes for a fadeaway jumper"
-        ]
-        
-        # Select move based on shot type
-        move = random.choice(inside_moves if shot_type == 'inside' else outside_moves)
-        
-        # Build description
-        description = f"{offensive_player['name']} {move}"
-        
-        # Add defensive context
-        if random.random() < 0.7:  # 70% chance to mention defense
-            defensive_actions = [
-                f"with {defensive_player['name']} contesting",
-                f"against tight defense from {defensive_player['name']}",
-                f"with {defensive_player['name']} right there",
-                f"over {defensive_player['name']}"
-            ]
-            description += f" {random.choice(defensive_actions)}"
-        
-        # Add result
-        if successful:
-            success_phrases = [
-                "... and it's good!",
-                "... it drops in!",
-                "... nothing but net!",
-                "... count it!",
-                "... and scores!",
-                "... and converts!"
-            ]
-            description += f" {random.choice(success_phrases)}"
-        else:
-            miss_phrases = [
-                "... but misses!",
-                "... off the rim!",
-                "... but it's no good!",
-                "... but can't connect!",
-                "... but it rims out!"
-            ]
-            description += f" {random.choice(miss_phrases)}"
+            rebound_text = f"{defense_name} secures the defensive rebound."
+            self._log(LogEntry("rebound", rebound_text))
+    
+    def _generate_shot_description(self, offensive_player, defensive_player, shot_type, successful, draws=None):
+        """
+        Generate a descriptive text for a shot attempt.
         
-        return description
+        Args:
+            offensive_player: The player taking the shot
+            defensive_player: The player defending
+            shot_type: Either 'inside' or 'outside'
+            successful: Whether the shot went in
+            draws: Optional four uniform numbers in [0, 1) used to pick the phrases;
+                drawn from the simulator's generator when omitted
+        
+        Returns:
+            The shot description
+        """
+        if draws is None:
+            draws = self._rng.random(4)
+        
+        # Select move based on shot type, and the result phrase
+        moves = _INSIDE_MOVES if shot_type == 'inside' else _OUTSIDE_MOVES
+        move = moves[int(draws[0] * len(moves))]
+        results = _SUCCESS_PHRASES if successful else _MISS_PHRASES
+        result = results[int(draws[3] * len(results))]
+        
+        # Add defensive context (70% chance to mention defense)
+        action = _DEFENSIVE_ACTIONS[int(draws[2] * len(_DEFENSIVE_ACTIONS))] if draws[1] < 0.7 else None
+        def_part = f" {action.format(defender=defensive_player['name'])}" if action else ""
+        
+        # Build the description in a single f-string
+        return f"{offensive_player['name']} {move}{def_part} {result}"
     
     def _generate_block_description(self, offensive_player, defensive_player, shot_type):
         """Generate a descriptive text for a blocked shot."""
-        if shot_type == 'inside':
-            block_phrases = [
-                f"{offensive_player['name']} goes up for the shot, but {defensive_player['name']} BLOCKS it emphatically!",
-                f"{defensive_player['name']} meets {offensive_player['name']} at the rim and rejects the shot!",
-                f"Great defense! {defensive_player['name']} swats away {offensive_player['name']}'s attempt!",
-                f"{offensive_player['name']} drives in but {defensive_player['name']} times it perfectly for the block!"
-            ]
-        else:
-            block_phrases = [
-                f"{offensive_player['name']} pulls up, but {defensive_player['name']} gets a piece of it!",
-                f"{defensive_player['name']} closes out quickly and blocks {offensive_player['name']}'s jumper!",
-                f"Great perimeter defense! {defensive_player['name']} blocks the shot attempt!",
-                f"{offensive_player['name']}'s shot is rejected by {defensive_player['name']}!"
-            ]
-        
-        return random.choice(block_phrases)
-    
-    def simulate_full_game(self):
-        """Simulate the entire game until completion."""
-        # Initialize game
-        self.game_log = []
-        self.score = {self.player1['name']: 0, self.player2['name']: 0}
-        self.possession = random.choice([self.player1, self.player2])
-        self.winner = None
+        block_phrases = _INSIDE_BLOCK_PHRASES if shot_type == 'inside' else _OUTSIDE_BLOCK_PHRASES
+        return block_phrases[self._rng.integers(len(block_phrases))].format(shooter=offensive_player['name'], defender=defensive_player['name'])
+    
+    def simulate_full_game(self, seed=None):
+        """
+        Simulate the entire game until completion.
         
-        # Start the game with an introduction
-        intro = f"Welcome to this 1v1 showdown between {self.player1['name']} and {self.player2['name']}! "
-        intro += f"First to {self.target_score} points wins, and we're playing {'make it, take it' if self.make_it_take_it else 'alternating possession'} rules. "
-        intro += f"{self.possession['name']} wins the tip and will start with the ball."
-        self.game_log.append({"type": "intro", "text": intro})
+        Args:
+            seed: Optional seed for a reproducible game; without it the simulator's own
+                generator is used
         
-        # Track fatigue
-        fatigue = {self.player1['name']: 0, self.player2['name']: 0}
+        Returns:
+            Dictionary with the game log, final score, winner and both players
+        """
+        rng = self._rng if seed is None else np.random.default_rng(seed)
         
-        # Simulate possessions until target score is reached
-        possession_count = 0
-        alternate_possession = not self.make_it_take_it
+        # Play the possessions in the compiled core, then narrate the events
+        events, first_offense = run_game(self.stats, self.target_score, self.make_it_take_it,
+                                         int(rng.integers(2**32)))
+        if not self.narrate:
+            return self._tally_game(events)
         
-        while max(self.score.values()) < self.target_score and possession_count < 100:  # Safety limit
-            possession_count += 1
-            
+        # Draw the numbers for picking commentary phrases in one go, four per possession
+        # (as Python floats, which are quicker to index and compare than NumPy scalars)
+        phrase_draws = rng.random((len(events), 4)).tolist()
+        
+        # Initialize game and start it with an introduction
+        self._reset(first_offense)
+        winner_idx = None
+        score = self.score
+        
+        # Look the names up once, and build the two "checks the ball" entries up front
+        names = tuple(player['name'] for player in self.players)
+        check_ball = tuple(LogEntry("check_ball", f"{name} checks the ball at the top of the key.") for name in names)
+        
+        for (kind, off_idx, outside), draws in zip(events.tolist(), phrase_draws):
             # Get current players
-            offensive_player = self.possession
-            defensive_player = self.player2 if offensive_player == self.player1 else self.player1
+            def_idx = 1 - off_idx
+            offensive_player = self.players[off_idx]
+            defensive_player = self.players[def_idx]
+            offense_name = names[off_idx]
+            defense_name = names[def_idx]
             
             # Add "checks the ball" action every possession
-            check_ball = f"{offensive_player['name']} checks the ball at the top of the key."
-            self.game_log.append({"type": "check_ball", "text": check_ball})
-            
-            # Apply fatigue effects (players get tired as game progresses)
-            fatigue_factor = 1.0 - (fatigue[offensive_player['name']] * 0.01 * (1.0 / offensive_player.get('stamina', 1.0)))
+            self._log(check_ball[off_idx])
             
-            # Determine if there's a turnover
-            turnover_chance = 0.05 + (offensive_player.get('Turnovers Per Game (TOV)', 2.0) / 40)
-            if random.random() < turnover_chance:
-                turnover_text = f"{offensive_player['name']} loses control of the ball! Turnover to {defensive_player['name']}."
-                self.game_log.append({"type": "turnover", "text": turnover_text})
-                self.possession = defensive_player
+            if kind == EVT_TURNOVER:
+                turnover_text = f"{offense_name} loses control of the ball! Turnover to {defense_name}."
+                self._log(LogEntry("turnover", turnover_text))
                 continue
             
-            # Determine shot type based on player position and tendencies
-            shot_type_odds = 0.7  # Base chance for inside shot
-            if offensive_player['position'] in ['PG', 'SG', 'SF']:
-                shot_type_odds = 0.5  # Guards and wings take more outside shots
-            
-            # Adjust based on three-point percentage
-            three_pt_pct = offensive_player.get('Three-Point Percentage (3P%)', 30.0)
-            if three_pt_pct > 35:  # Good three-point shooters
-                shot_type_odds -= 0.1
-            
-            shot_type = 'inside' if random.random() < shot_type_odds else 'outside'
-            
-            # Calculate success probability
-            success_prob = self._get_shot_success_probability(offensive_player, defensive_player, shot_type)
-            
-            # Apply fatigue factor
-            success_prob *= fatigue_factor
-            
-            # Determine if shot is successful
-            shot_successful = random.random() < success_prob
-            
             # Generate description and update game state
-            shot_description = self._generate_shot_description(offensive_player, defensive_player, shot_type, shot_successful)
+            shot_type = 'outside' if outside else 'inside'
+            shot_successful = kind == EVT_SHOT_MADE
+            shot_description = self._generate_shot_description(offensive_player, defensive_player, shot_type, shot_successful, draws)
             
             if shot_successful:
                 # Award points
-                points = 1 if shot_type == 'inside' else 2
-                self.score[offensive_player['name']] += points
+                points = 2 if outside else 1
+                score[off_idx] += points
                 
                 # Add to game log
-                shot_text = f"{shot_description} {offensive_player['name']} scores! "
-                shot_text += f"Score: {offensive_player['name']} {self.score[offensive_player['name']]}, {defensive_player['name']} {self.score[defensive_player['name']]}."
-                self.game_log.append({"type": "shot_made", "text": shot_text})
+                shot_text = (f"{shot_description} {offense_name} scores! "
+                             f"Score: {offense_name} {score[off_idx]}, {defense_name} {score[def_idx]}.")
+                self._log(LogEntry("shot_made", shot_text))
                 
                 # Check if game is over
-                if self.score[offensive_player['name']] >= self.target_score:
+                if score[off_idx] >= self.target_score:
                     self.winner = offensive_player
-                    break
-                
-                # Determine next possession
-                if not alternate_possession:  # Make it, take it
-                    pass  # Keep possession
-                else:
-                    self.possession = defensive_player
+                    winner_idx = off_idx
             else:
                 # Shot missed, defensive player gets rebound
-                rebound_text = f"{shot_description} {defensive_player['name']} grabs the rebound."
-                self.game_log.append({"type": "shot_missed", "text": rebound_text})
-                self.possession = defensive_player
-            
-            # Increase fatigue
-            fatigue[offensive_player['name']] += 0.5
-            fatigue[defensive_player['name']] += 0.3
+                rebound_text = f"{shot_description} {defense_name} grabs the rebound."
+                self._log(LogEntry("shot_missed", rebound_text))
         
         # Generate game conclusion
         if self.winner:
-            loser = self.player2 if self.winner == self.player1 else self.player1
-            conclusion = f"Game over! {self.winner['name']} wins {self.score[self.winner['name']]} to {self.score[loser['name']]}!"
-            self.game_log.append({"type": "conclusion", "text": conclusion})
+            conclusion = f"Game over! {self.winner['name']} wins {self.score[winner_idx]} to {self.score[1 - winner_idx]}!"
+            self._log(LogEntry("conclusion", conclusion))
         else:
             conclusion = "The game reached the maximum number of possessions without a winner."
-            self.game_log.append({"type": "conclusion", "text": conclusion})
+            self._log(LogEntry("conclusion", conclusion))
         
         # Return game result
         return {
             "game_log": self.game_log,
-            "final_score": self.score,
+            "final_score": self._final_score(),
             "winner": self.winner['name'] if self.winner else None,
             "player1": self.player1,
             "player2": self.player2
         }
     
-    def get_enhanced_commentary(self):
-        """
-        Use Gemini API to generate enhanced play-by-play commentary
-        based on the simulated game log.
-        """
-        # Prepare the prompt for Gemini
-        prompt = f"""
-        You are a basketball commentator providing play-by-play commentary for a 1-on-1 basketball game.
+    def _log(self, entry):
+        """Add an entry to the game log, keeping only a log_sample_rate share of entries."""
+        if self.log_sample_rate < 1.0:
+            # Keep every (1 / rate)-th entry by accumulating the rate, so no random draw is needed
+            self._log_acc += self.log_sample_rate
+            if self._log_acc < 1.0:
+                return
+            self._log_acc -= 1.0
+        self.game_log.append(entry)
+    
+    def _tally_game(self, events):
+        """Record a game's result from its events without generating any text."""
+        points = np.where(events[:, EVENT_KIND] == EVT_SHOT_MADE, 1 + events[:, EVENT_OUTSIDE], 0)
+        self._reset()
+        for entry in zip(events[:, EVENT_KIND].tolist(), events[:, EVENT_OFFENSE].tolist(), points.tolist()):
+            self._log(entry)
+        
+        totals = np.bincount(events[:, EVENT_OFFENSE], weights=points, minlength=2)
+        self.score = array.array('i', totals.astype(np.int64).tolist())
+        self.winner = None
+        for player, total in zip(self.players, self.score):
+            if total >= self.target_score:
+                self.winner = player
+        
+        return {
+            "game_log": self.game_log,
+            "final_score": self._final_score(),
+            "winner": self.winner['name'] if self.winner else None,
+            "player1": self.player1,
+            "player2": self.player2
+        }
+    
+    def _final_score(self):
+        """Return the score as a dictionary keyed by player name."""
+        return {player['name']: points for player, points in zip(self.players, self.score)}
+    
+    def _commentary_prompt(self):
+        """Build the per-game part of the Gemini commentary prompt."""
+        # The player data doesn't change between games, so only serialize it once
+        if self.players_json is None:
+            self.players_json = tuple(orjson.dumps(player).decode() for player in self.players)
         
-        Player 1: {json.dumps(self.player1, indent=2)}
+        # Write the game log straight into the buffer
+        prompt = io.StringIO()
+        prompt.write(f"""
+        Player 1: {self.players_json[0]}
         
-        Player 2: {json.dumps(self.player2, indent=2)}
+        Player 2: {self.players_json[1]}
         
         Game Rules:
         - First to {self.target_score} points wins (must win by 2)
@@ -482,75 +679,97 @@ class BasketballSimulator:
         - {'Make it, take it rules (scorer keeps possession)' if self.make_it_take_it else 'Alternating possession after made baskets'}
         
         Game Log:
-        {json.dumps([entry['text'] for entry in self.game_log], indent=2)}
-        
-        Please provide an engaging, detailed play-by-play commentary of this game, highlighting key moments,
-        player strengths/weaknesses, and tactical decisions. Make it sound like an exciting broadcast.
-        
-        Format your response with the following requirements:
-        1. Use HTML formatting for better readability
-        2. DO NOT use headings like "Game Summary", "Introduction:", etc. at the beginning of the commentary
-        3. Start directly with the play-by-play narrative without any headers
-        4. Use <h3> tags only for meaningful section headings if needed (First Half, Second Half, etc.)
-        5. Use <p> tags for paragraphs
-        6. Use <strong> or <b> tags to emphasize important moments, player names, and scores
-        7. Use <br> tags for line breaks within paragraphs where appropriate
-        8. Create a clear structure with game progression and conclusion
-        9. Include statistics and highlight key plays in a visually distinct way
-        10. For the final score, make it stand out with bold formatting
-        
-        Include an introduction, the play-by-play narrative organized by game progression, and a conclusion with the final result.
+""")
+        for entry in self.game_log:
+            prompt.write(entry.text)
+            prompt.write('\n')
+        return prompt.getvalue()
+    
+    def _format_commentary(self, enhanced_commentary):
+        """Add basic HTML formatting to a response that doesn't have any."""
+        if '<' in enhanced_commentary or '>' in enhanced_commentary:
+            return enhanced_commentary
+        
+        # Split by double newlines to identify paragraphs
+        paragraphs = enhanced_commentary.split('\n\n')
+        formatted_text = []
+        
+        # Player names and score mentions (like 11-9) are highlighted in a single pass
+        names = sorted((self.player1['name'], self.player2['name']), key=len, reverse=True)
+        highlight_re = re.compile('|'.join([re.escape(name) for name in names] + [r'\d+-\d+']))
+        
+        # Process each paragraph
+        for i, para in enumerate(paragraphs):
+            # Check if paragraph looks like a section header (short and ends with colon)
+            if len(para) < 50 and para.strip().endswith(':') and i > 0:  # Skip first paragraph headers
+                # Skip if it contains "Game Summary" or "Introduction"
+                if "game summary" not in para.lower() and "introduction" not in para.lower():
+                    formatted_text.append(f"<h3>{para}</h3>")
+            else:
+                # Highlight player names and scores
+                para = highlight_re.sub(r'<strong>\g<0></strong>', para)
+                
+                # Add paragraph tags
+                formatted_text.append(f"<p>{para}</p>")
+        
+        return "\n\n".join(formatted_text)
+    
+    def _fallback_commentary(self, error):
+        """Build plain commentary from the game log when the Gemini API fails."""
+        print(f"Error calling Gemini API: {error}")
+        fallback_text = ""
+        for entry in self.game_log:
+            if entry.type == 'intro':
+                fallback_text += f"<p>{entry.text}</p>\n"
+            elif entry.type == 'conclusion':
+                fallback_text += f"<p><strong>{entry.text}</strong></p>\n"
+            elif entry.type in ['shot_made', 'shot_missed', 'block', 'turnover']:
+                fallback_text += f"<p>{entry.text}</p>\n"
+        return fallback_text
+    
+    def get_enhanced_commentary(self):
+        """
+        Use Gemini API to generate enhanced play-by-play commentary
+        based on the simulated game log.
         """
+        prompt = self._commentary_prompt()
+        try:
+            # Call Gemini API (or reuse the response for an identical game)
+            return self._format_commentary(_gemini(prompt))
+        except Exception as e:
+            return self._fallback_commentary(e)
+    
+    async def get_enhanced_commentary_async(self):
+        """Async version of get_enhanced_commentary, so several games can wait on Gemini at once."""
+        prompt = self._commentary_prompt()
+        try:
+            return self._format_commentary(await _gemini_async(prompt))
+        except Exception as e:
+            return self._fallback_commentary(e)
+    
+    async def stream_enhanced_commentary(self):
+        """
+        Yield the Gemini commentary in HTML chunks as they arrive, for streaming to the browser.
         
+        The instructions ask Gemini for HTML, so unlike get_enhanced_commentary the chunks
+        aren't post-formatted. If the API fails before anything arrives, the plain fallback
+        commentary is yielded instead; if it fails partway through, the stream ends with
+        COMMENTARY_INTERRUPTED so callers can tell it apart from a complete one.
+        """
+        streamed = False
         try:
-            # Call Gemini API
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(prompt)
-            enhanced_commentary = response.text
-            
-            # If the response doesn't contain HTML formatting, add basic formatting
-            if '<' not in enhanced_commentary and '>' not in enhanced_commentary:
-                # Split by double newlines to identify paragraphs
-                paragraphs = enhanced_commentary.split('\n\n')
-                formatted_text = []
-                
-                # Process each paragraph
-                for i, para in enumerate(paragraphs):
-                    # Check if paragraph looks like a section header (short and ends with colon)
-                    if len(para) < 50 and para.strip().endswith(':') and i > 0:  # Skip first paragraph headers
-                        # Skip if it contains "Game Summary" or "Introduction"
-                        if "game summary" not in para.lower() and "introduction" not in para.lower():
-                            formatted_text.append(f"<h3>{para}</h3>")
-                    else:
-                        # Highlight player names, scores, and key terms
-                        for player_name in [self.player1['name'], self.player2['name']]:
-                            para = para.replace(player_name, f"<strong>{player_name}</strong>")
-                        
-                        # Highlight score mentions
-                        import re
-                        para = re.sub(r'(\d+)-(\d+)', r'<strong>\1-\2</strong>', para)
-                        
-                        # Add paragraph tags
-                        formatted_text.append(f"<p>{para}</p>")
-                
-                enhanced_commentary = "\n\n".join(formatted_text)
-            
-            return enhanced_commentary
+            async for chunk in _gemini_stream(self._commentary_prompt()):
+                streamed = True
+                yield chunk
         except Exception as e:
-            # Fallback if API fails
-            print(f"Error calling Gemini API: {e}")
-            fallback_text = ""
-            for entry in self.game_log:
-                if entry['type'] == 'intro':
-                    fallback_text += f"<p>{entry['text']}</p>\n"
-                elif entry['type'] == 'conclusion':
-                    fallback_text += f"<p><strong>{entry['text']}</strong></p>\n"
-                elif entry['type'] in ['shot_made', 'shot_missed', 'block', 'turnover']:
-                    fallback_text += f"<p>{entry['text']}</p>\n"
-            return fallback_text
-
-
-def simulate_game(player1_data, player2_data, target_score=11, make_it_take_it=True, use_gemini=True):
+            if streamed:
+                print(f"Error calling Gemini API: {e}")
+                yield COMMENTARY_INTERRUPTED
+            else:
+                yield self._fallback_commentary(e)
+
+
+def simulate_game(player1_data, player2_data, target_score=11, make_it_take_it=True, use_gemini=True, seed=None):
     """
     Simulate a 1-on-1 basketball game between two players.
     
@@ -560,12 +779,13 @@ def simulate_game(player1_data, player2_data, target_score=11, make_it_take_it=T
         target_score: Points needed to win (default: 11)
         make_it_take_it: If True, scorer keeps possession (default: True)
         use_gemini: If True, use Gemini API for enhanced commentary
+        seed: Optional seed for a reproducible game
     
     Returns:
         Dictionary containing game results and commentary
     """
     # Create simulator (player enhancement happens in the constructor)
-    simulator = BasketballSimulator(player1_data, player2_data, target_score, make_it_take_it)
+    simulator = BasketballSimulator(player1_data, player2_data, target_score, make_it_take_it, seed=seed)
     
     # Run simulation
     game_result = simulator.simulate_full_game()
@@ -586,6 +806,149 @@ def simulate_game(player1_data, player2_data, target_score=11, make_it_take_it=T
     return game_result
 
 
+async def simulate_games_with_commentary(matchups, target_score=11, make_it_take_it=True, concurrency=8):
+    """
+    Simulate several games and fetch their Gemini commentary concurrently.
+    
+    Call with asyncio.run(simulate_games_with_commentary(...)).
+    
+    Args:
+        matchups: Iterable of (player1_data, player2_data) pairs
+        target_score: Points needed to win (default: 11)
+        make_it_take_it: If True, scorer keeps possession (default: True)
+        concurrency: Maximum number of Gemini requests in flight at once (default: 8)
+    
+    Returns:
+        List of game results as returned by simulate_game, in matchup order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(
+        _game_with_commentary(player1_data, player2_data, target_score, make_it_take_it, semaphore)
+        for player1_data, player2_data in matchups
+    ))
+
+
+async def iter_games_with_commentary(matchups, target_score=11, make_it_take_it=True, concurrency=8):
+    """
+    Like simulate_games_with_commentary, but yield each game as soon as its commentary arrives.
+    
+    Each result carries a 'matchup_index' giving its position in matchups.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        _game_with_commentary(player1_data, player2_data, target_score, make_it_take_it, semaphore, index)
+        for index, (player1_data, player2_data) in enumerate(matchups)
+    ]
+    for next_game in asyncio.as_completed(tasks):
+        yield await next_game
+
+
+async def _game_with_commentary(player1_data, player2_data, target_score, make_it_take_it, semaphore,
+                                matchup_index=None):
+    """Simulate one game, then wait for a semaphore slot to fetch its commentary."""
+    # Simulating takes about a millisecond, so it's done up front; only the API call waits
+    simulator = BasketballSimulator(player1_data, player2_data, target_score, make_it_take_it)
+    game_result = simulator.simulate_full_game()
+    game_result['enhanced_player1'] = simulator.player1
+    game_result['enhanced_player2'] = simulator.player2
+    if matchup_index is not None:
+        game_result['matchup_index'] = matchup_index
+    async with semaphore:
+        game_result['enhanced_commentary'] = await simulator.get_enhanced_commentary_async()
+    return game_result
+
+
+async def simulate_game_streaming(player1_data, player2_data, target_score=11, make_it_take_it=True, seed=None):
+    """
+    Simulate a game and stream its Gemini commentary.
+    
+    The first item yielded is the game result (as returned by simulate_game with
+    use_gemini=False, plus the enhanced players); every later item is a chunk of
+    HTML commentary, e.g. for forwarding as server-sent events.
+    
+    Args:
+        player1_data: Dictionary with player 1's stats
+        player2_data: Dictionary with player 2's stats
+        target_score: Points needed to win (default: 11)
+        make_it_take_it: If True, scorer keeps possession (default: True)
+        seed: Optional seed for a reproducible game
+    """
+    simulator = BasketballSimulator(player1_data, player2_data, target_score, make_it_take_it, seed=seed)
+    game_result = simulator.simulate_full_game()
+    game_result['enhanced_player1'] = simulator.player1
+    game_result['enhanced_player2'] = simulator.player2
+    yield game_result
+    
+    async for chunk in simulator.stream_enhanced_commentary():
+        yield chunk
+
+
+def simulate_games_batch(player1_data, player2_data, n_games, target_score=11, make_it_take_it=True, seed=None):
+    """
+    Simulate many games between two players at once.
+    
+    Plays the same possessions as BasketballSimulator.simulate_full_game, with
+    the games run in parallel by the compiled core so win-probability estimates
+    don't pay Python overhead on every possession. No play-by-play text is
+    generated.
+    
+    Args:
+        player1_data: Dictionary with player 1's stats
+        player2_data: Dictionary with player 2's stats
+        n_games: Number of games to simulate (at least 1)
+        target_score: Points needed to win (default: 11)
+        make_it_take_it: If True, scorer keeps possession (default: True)
+        seed: Optional seed for reproducible results
+    
+    Returns:
+        Dictionary with per-game scores (n_games x 2 array), winners (0 or 1, -1 if the
+        possession limit was reached) and each player's win rate
+    
+    Raises:
+        ValueError: If n_games is less than 1
+    """
+    # Win rates over zero games would be NaN
+    if n_games < 1:
+        raise ValueError(f"n_games must be at least 1, got {n_games}")
+    
+    # Reuse the simulator for player enhancement and derived stats
+    simulator = BasketballSimulator(player1_data, player2_data, target_score, make_it_take_it)
+    
+    # One independent seed per game, spawned from the master seed; only the scores
+    # are kept, so memory doesn't grow with every game's event rows
+    seeds = np.random.SeedSequence(seed).generate_state(n_games)
+    scores = run_games_scores(simulator.stats, target_score, make_it_take_it, n_games, seeds)
+    
+    # Games that hit the possession limit have no winner
+    winners = np.where(scores[:, 0] >= target_score, 0, np.where(scores[:, 1] >= target_score, 1, -1))
+    
+    return {
+        "scores": scores,
+        "winners": winners,
+        "player1_win_rate": float(np.mean(winners == 0)),
+        "player2_win_rate": float(np.mean(winners == 1)),
+    }
+
+
+def simulate_win_probability(player1_data, player2_data, n_games=10000, target_score=11, make_it_take_it=True, seed=None):
+    """
+    Estimate each player's chance of winning the matchup from many simulated games.
+    
+    Args:
+        player1_data: Dictionary with player 1's stats
+        player2_data: Dictionary with player 2's stats
+        n_games: Number of games to simulate, at least 1 (default: 10000)
+        target_score: Points needed to win (default: 11)
+        make_it_take_it: If True, scorer keeps possession (default: True)
+        seed: Optional seed for reproducible results
+    
+    Returns:
+        Tuple of (player 1 win probability, player 2 win probability)
+    """
+    result = simulate_games_batch(player1_data, player2_data, n_games, target_score, make_it_take_it, seed)
+    return result['player1_win_rate'], result['player2_win_rate']
+
+
 if __name__ == "__main__":
     # Test the simulator with sample data
     player1 = {
@@ -612,4 +975,4 @@ if __name__ == "__main__":
     
     result = simulate_game(player1, player2, use_gemini=False)
     for entry in result['game_log']:
-        print(entry['text'])
+        print(entry.text)
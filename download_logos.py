@@ -1,87 +1,150 @@
 import os
+import shutil
+import asyncio
+from pathlib import Path
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import quote
 from bs4 import BeautifulSoup
 import re
 
-def create_default_logo():
-    # Create a default logo for missing teams
-    default_logo = """<svg width="100" height="100" viewBox="0 0 100 100" xmlns="http://www.w3.org/2000/svg">
+# Base URL for team logos (using a more reliable source)
+BASE_URL = "https://www.nba.com/.element/img/team/logos/{team}_logo.svg"
+
+# Number of logos downloaded at once
+MAX_WORKERS = 12
+
+def create_session():
+    # Every logo comes from www.nba.com, so pooled keep-alive connections (and their TLS
+    # handshakes) are reused across teams; the Connection header is left at its keep-alive default
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    })
+    # Retry transient failures (connection errors, rate limits, 5xx) with jittered exponential
+    # backoff, honouring Retry-After, so the SVG fallback is only written once retries run out
+    # (backoff_jitter needs urllib3 2, which requirements.txt pins)
+    retries = Retry(total=4, backoff_factor=0.5, backoff_jitter=0.25,
+                    status_forcelist=[429, 500, 502, 503, 504], respect_retry_after_header=True)
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS, max_retries=retries))
+    return session
+
+# Shared by every download, including repeat calls to download_logos()
+_SESSION = create_session()
+
+def _fetch_one(team_name, filename, session=_SESSION):
+    # Stream the logo to disk in chunks rather than holding the whole body in memory.
+    # It goes to a temporary file first, so a failed download never leaves a partial logo.
+    # Returns None on success, or the error instead of raising so the caller can fall back.
+    part_filename = f"{filename}.part"
+    try:
+        with session.get(BASE_URL.format(team=_TEAM_SLUGS[team_name]), stream=True, timeout=10) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True  # Undo any gzip transfer encoding
+            with open(part_filename, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=64 * 1024)
+        os.replace(part_filename, filename)
+        return team_name, None
+    except Exception as e:
+        if os.path.exists(part_filename):
+            os.remove(part_filename)
+        return team_name, e
+
+# Default logo for missing teams, kept as bytes so it's written without encoding
+_DEFAULT_LOGO_BYTES = b"""<svg width="100" height="100" viewBox="0 0 100 100" xmlns="http://www.w3.org/2000/svg">
         <circle cx="50" cy="50" r="45" fill="#1d428a"/>
         <text x="50" y="60" font-family="Arial" font-size="40" fill="white" text-anchor="middle">NBA</text>
     </svg>"""
-    
+
+# Simple logo for a team whose logo couldn't be downloaded; %b is the team name
+_TEAM_LOGO_TEMPLATE = b"""<svg width="100" height="100" viewBox="0 0 100 100" xmlns="http://www.w3.org/2000/svg">
+        <rect width="100" height="100" fill="#1d428a" rx="10"/>
+        <text x="50" y="60" font-family="Arial" font-size="12" fill="white" text-anchor="middle">%b</text>
+    </svg>"""
+
+def create_default_logo():
+    # Create a default logo for missing teams
     os.makedirs('static/team_logos', exist_ok=True)
-    with open('static/team_logos/default.png', 'wb') as f:
-        f.write(default_logo.encode())
+    Path('static/team_logos/default.png').write_bytes(_DEFAULT_LOGO_BYTES)
     print("Created default logo")
 
-def download_logos():
+# NBA teams and the slug used in their logo URL (e.g. 'Los Angeles Lakers' -> 'lakers')
+_TEAM_SLUGS = {
+    'Atlanta Hawks': 'hawks', 'Boston Celtics': 'celtics', 'Brooklyn Nets': 'nets',
+    'Charlotte Hornets': 'hornets', 'Chicago Bulls': 'bulls', 'Cleveland Cavaliers': 'cavaliers',
+    'Dallas Mavericks': 'mavericks', 'Denver Nuggets': 'nuggets', 'Detroit Pistons': 'pistons',
+    'Golden State Warriors': 'warriors', 'Houston Rockets': 'rockets', 'Indiana Pacers': 'pacers',
+    'LA Clippers': 'clippers', 'Los Angeles Lakers': 'lakers', 'Memphis Grizzlies': 'grizzlies',
+    'Miami Heat': 'heat', 'Milwaukee Bucks': 'bucks', 'Minnesota Timberwolves': 'timberwolves',
+    'New Orleans Pelicans': 'pelicans', 'New York Knicks': 'knicks', 'Oklahoma City Thunder': 'thunder',
+    'Orlando Magic': 'magic', 'Philadelphia 76ers': '76ers', 'Phoenix Suns': 'suns',
+    'Portland Trail Blazers': 'blazers', 'Sacramento Kings': 'kings', 'San Antonio Spurs': 'spurs',
+    'Toronto Raptors': 'raptors', 'Utah Jazz': 'jazz', 'Washington Wizards': 'wizards'
+}
+
+# Logo filename for each team (lowercase with underscores)
+_LOGO_NAMES = {team_name: f"{team_name.lower().replace(' ', '_')}.svg" for team_name in _TEAM_SLUGS}
+
+def _missing_logos():
     # Create the team_logos directory if it doesn't exist
     os.makedirs('static/team_logos', exist_ok=True)
     
-    # NBA teams and their abbreviations
-    teams = [
-        'Atlanta Hawks', 'Boston Celtics', 'Brooklyn Nets', 'Charlotte Hornets', 
-        'Chicago Bulls', 'Cleveland Cavaliers', 'Dallas Mavericks', 'Denver Nuggets',
-        'Detroit Pistons', 'Golden State Warriors', 'Houston Rockets', 'Indiana Pacers',
-        'LA Clippers', 'Los Angeles Lakers', 'Memphis Grizzlies', 'Miami Heat',
-        'Milwaukee Bucks', 'Minnesota Timberwolves', 'New Orleans Pelicans',
-        'New York Knicks', 'Oklahoma City Thunder', 'Orlando Magic',
-        'Philadelphia 76ers', 'Phoenix Suns', 'Portland Trail Blazers',
-        'Sacramento Kings', 'San Antonio Spurs', 'Toronto Raptors',
-        'Utah Jazz', 'Washington Wizards'
-    ]
+    # Read the directory once instead of checking each file separately
+    existing = frozenset(os.listdir('static/team_logos'))
     
-    # Base URL for team logos (using a more reliable source)
-    base_url = "https://www.nba.com/.element/img/team/logos/{team}_logo.svg"
+    # Skip the teams whose logo file already exists
+    to_download = {}
+    for team_name, logo_name in _LOGO_NAMES.items():
+        if logo_name in existing:
+            print(f"Skipping {team_name} - file exists")
+        else:
+            to_download[team_name] = f"static/team_logos/{logo_name}"
+    return to_download, existing
+
+def _save_logo(team_name, filename, error):
+    # The download has already written the logo unless there was an error
+    if error is None:
+        print(f"Downloaded {team_name} logo to {filename}")
+        return
     
-    # Download each team's logo
-    for team_name in teams:
-        try:
-            # Convert team name to filename format (lowercase with underscores)
-            filename = f"static/team_logos/{team_name.lower().replace(' ', '_')}.svg"
-            
-            # Skip if file already exists
-            if os.path.exists(filename):
-                print(f"Skipping {team_name} - file exists")
-                continue
-                
-            # Format team name for URL (e.g., 'Los Angeles Lakers' -> 'lakers')
-            team_slug = team_name.lower().split()[-1]
-            if team_name == 'New York Knicks':
-                team_slug = 'knicks'
-            elif team_name == 'Golden State Warriors':
-                team_slug = 'warriors'
-                
-            # Download the logo
-            url = base_url.format(team=team_slug)
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # Save the logo
-            with open(filename, 'wb') as f:
-                f.write(response.content)
-                
-            print(f"Downloaded {team_name} logo to {filename}")
-            
-        except Exception as e:
-            print(f"Error downloading {team_name} logo: {e}")
-            # Create a simple SVG logo for the team
-            team_svg = f"""<svg width="100" height="100" viewBox="0 0 100 100" xmlns="http://www.w3.org/2000/svg">
-                <rect width="100" height="100" fill="#1d428a" rx="10"/>
-                <text x="50" y="60" font-family="Arial" font-size="12" fill="white" text-anchor="middle">{team_name.upper()}</text>
-            </svg>"""
-            with open(filename, 'w') as f:
-                f.write(team_svg)
-            print(f"Created simple logo for {team_name}")
+    print(f"Error downloading {team_name} logo: {error}")
+    # Create a simple SVG logo for the team
+    Path(filename).write_bytes(_TEAM_LOGO_TEMPLATE % team_name.upper().encode())
+    print(f"Created simple logo for {team_name}")
+
+def download_logos():
+    to_download, existing = _missing_logos()
+    
+    # Download the logos in parallel; fallbacks are written here as each download finishes
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(_fetch_one, team_name, filename, _SESSION)
+                   for team_name, filename in to_download.items()]
+        for future in as_completed(futures):
+            team_name, error = future.result()
+            _save_logo(team_name, to_download[team_name], error)
     
     # Create default logo if it doesn't exist
-    if not os.path.exists('static/team_logos/default.png'):
+    if 'default.png' not in existing:
         create_default_logo()
 
+async def download_logos_async():
+    # Same as download_logos, for callers already running an event loop (await download_logos_async()).
+    # The blocking requests and file writes run in worker threads, so the loop is never blocked.
+    to_download, existing = await asyncio.to_thread(_missing_logos)
+    semaphore = asyncio.Semaphore(MAX_WORKERS)
+    
+    async def fetch_and_save(team_name, filename):
+        async with semaphore:
+            team_name, error = await asyncio.to_thread(_fetch_one, team_name, filename, _SESSION)
+        await asyncio.to_thread(_save_logo, team_name, filename, error)
+    
+    await asyncio.gather(*(fetch_and_save(team_name, filename) for team_name, filename in to_download.items()))
+    
+    # Create default logo if it doesn't exist
+    if 'default.png' not in existing:
+        await asyncio.to_thread(create_default_logo)
+
 if __name__ == "__main__":
     download_logos()
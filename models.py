@@ -0,0 +1,77 @@
+"""
+Player Model Module
+
+This module defines the Player record loaded from players.json. Players are
+stored as slotted, frozen dataclasses instead of plain dicts, which keeps the
+per-player footprint small and makes attribute access (as done throughout the
+templates) a direct slot read.
+"""
+
+from dataclasses import dataclass
+
+# Attribute name for each key used in players.json
+JSON_KEYS = {
+    'id': 'id',
+    'name': 'name',
+    'team': 'team',
+    'position': 'position',
+    'points': 'points',
+    'rebounds': 'rebounds',
+    'assists': 'assists',
+    'free_throw_pct': 'Free Throw Percentage (FT%)',
+    'field_goal_pct': 'Field Goal Percentage (FG%)',
+    'three_point_pct': 'Three-Point Percentage (3P%)',
+    'true_shooting_pct': 'True Shooting Percentage (TS%)',
+    'minutes_per_game': 'Average Minutes Per Game (MPG)',
+    'height': 'height',
+    'photo_url': 'photo_url',
+}
+ATTRIBUTE_NAMES = {key: attr for attr, key in JSON_KEYS.items()}
+
+
+@dataclass(frozen=True, slots=True)
+class Player:
+    id: str
+    name: str
+    team: str
+    position: str
+    points: float
+    rebounds: float
+    assists: float
+    free_throw_pct: float
+    field_goal_pct: float
+    three_point_pct: float
+    true_shooting_pct: float
+    minutes_per_game: float
+    height: str
+    photo_url: str
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a Player from a players.json entry.
+
+        Args:
+            data: Dictionary keyed by the players.json stat names
+
+        Returns:
+            Player with its id normalized to a string
+        """
+        fields = {attr: data[key] for attr, key in JSON_KEYS.items()}
+        fields['id'] = str(fields['id'])
+        return cls(**fields)
+
+    def to_dict(self):
+        """Return the player as a dictionary keyed by the players.json stat names."""
+        return {key: getattr(self, attr) for attr, key in JSON_KEYS.items()}
+
+    def __getitem__(self, key):
+        # Keep dict-style access by players.json key working, e.g. player['Field Goal Percentage (FG%)']
+        try:
+            return getattr(self, ATTRIBUTE_NAMES[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        attr = ATTRIBUTE_NAMES.get(key)
+        return default if attr is None else getattr(self, attr)
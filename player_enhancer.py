@@ -5,6 +5,108 @@ This module enhances player data by calculating derived attributes from existing
 These derived attributes are used to improve the realism of the basketball simulation.
 """
 
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+from sim_core import njit, prange
+
+# Stats the derived attributes depend on, with their defaults, in _enhance_core argument order
+_ENHANCER_STATS = (
+    ('Field Goal Percentage (FG%)', 45),
+    ('Three-Point Percentage (3P%)', 33),
+    ('Free Throw Percentage (FT%)', 75),
+    ('points', 10),
+    ('assists', 3),
+    ('rebounds', None),  # The default depends on position
+    ('Average Minutes Per Game (MPG)', 25),
+    ('True Shooting Percentage (TS%)', 55),
+    ('position', 'SF'),
+    ('height', '6\'0"'),
+)
+
+# Inputs to enhance_kernel: the numeric stats above, with NaN for the position-dependent default
+_KERNEL_INPUTS = tuple((key, np.nan if default is None else default)
+                       for key, default in _ENHANCER_STATS if key not in ('position', 'height'))
+FG, TP, FT, POINTS, ASSISTS, REBOUNDS, MPG, TS = range(len(_KERNEL_INPUTS))
+
+# Outputs of enhance_kernel, one column per derived attribute
+_KERNEL_OUTPUTS = (
+    'scoring_efficiency', 'usage_rate', 'estimated_blocks', 'estimated_steals',
+    'offensive_rebounds', 'defensive_rebounds', 'stamina', 'clutch_rating',
+    'three_point_tendency', 'defensive_impact',
+)
+
+# Reads every stat in one call when the player has the full players.json schema
+_get_enhancer_stats = itemgetter(*(key for key, _ in _ENHANCER_STATS))
+
+# Position codes
+POS_BIG, POS_GUARD, POS_WING = range(3)
+
+# Defensive estimates for each position code: (default rebounds, blocks base, blocks per rebound,
+# steals base, steals per assist, offensive rebound share, defensive rebound share)
+_POSITION_FACTORS = (
+    (5.0, 1.2, 0.1, 0.8, 0.0, 0.35, 0.65),  # Big men tend to block more shots but get fewer steals
+    (3.0, 0.3, 0.0, 1.2, 0.1, 0.2, 0.8),  # Guards get more steals, fewer blocks and fewer offensive rebounds
+    (4.0, 0.7, 0.0, 1.0, 0.0, 0.25, 0.75),  # Small forwards are balanced
+)
+
+# Order enhance_player_data adds the kernel outputs in, for each position code: big men
+# get estimated_blocks before estimated_steals, guards and wings the other way round
+_STEALS_FIRST = (0, 1, 3, 2) + tuple(range(4, len(_KERNEL_OUTPUTS)))
+_OUTPUT_ORDER = (tuple(range(len(_KERNEL_OUTPUTS))), _STEALS_FIRST, _STEALS_FIRST)
+
+# Weights of FG%, 3P% and FT% in scoring efficiency
+_SCORING_WEIGHTS = (0.5, 0.3, 0.2)
+
+# Weights of points and assists in usage rate, which is capped at _MAX_USAGE_RATE
+_USAGE_WEIGHTS = (2, 1.5)
+_MAX_USAGE_RATE = 100
+
+# Stamina starts at _STAMINA_BASE and gains _STAMINA_RANGE for every _FULL_MINUTES per game
+_STAMINA_BASE = 0.9
+_STAMINA_RANGE = 0.2
+_FULL_MINUTES = 40
+
+# Weights of FT% and TS% in clutch rating (a fraction, so the percentages are divided by 100)
+_CLUTCH_WEIGHTS = (0.6, 0.4)
+
+# Share of shots that are 3s when FG% - 3P% is under each gap, and otherwise
+_THREE_POINT_GAPS = (8, 15)
+_THREE_POINT_TENDENCIES = (0.6, 0.4, 0.2)
+
+# Weights of rebounds, blocks and steals in defensive impact, which is divided by _DEFENSIVE_IMPACT_SCALE
+_DEFENSIVE_IMPACT_WEIGHTS = (0.5, 2, 1.5)
+_DEFENSIVE_IMPACT_SCALE = 10
+_DEFAULT_REBOUNDS = 5
+
+def parse_height(height):
+    """
+    Convert a height string to inches.
+    
+    Args:
+        height: Height like 6'11 or 6'0"
+        
+    Returns:
+        Height in inches, or 72 if the string can't be parsed
+    """
+    feet, _, inches = height.partition("'")
+    inches = inches.rstrip('"')
+    try:
+        return int(feet) * 12 + (int(inches) if inches else 0)
+    except ValueError:
+        return 72
+
+@lru_cache(maxsize=None)
+def position_code(position):
+    """Classify a position string as a big, guard or wing (cached, as there are only a few distinct strings)."""
+    if any(pos in position for pos in ['C', 'PF']):
+        return POS_BIG
+    if any(pos in position for pos in ['PG', 'SG']):
+        return POS_GUARD
+    return POS_WING
+
 def enhance_player_data(player):
     """
     Enhance player data with derived attributes based on existing statistics.
@@ -15,73 +117,157 @@ def enhance_player_data(player):
     Returns:
         Enhanced player dictionary with additional derived attributes
     """
-    # Create a copy of the player dict to avoid modifying the original
-    enhanced_player = player.copy()
+    # Build a new dict to avoid modifying the original
+    return {**player, **enhance_derived(player)}
+
+def enhance_derived(player):
+    """
+    Calculate just the derived attributes for a player, without copying the player's stats.
+    
+    Combine with the player where needed, e.g. collections.ChainMap(derived, player)
+    for a read-only view that copies nothing.
     
+    Args:
+        player: Dictionary containing player stats
+        
+    Returns:
+        Dictionary of the attributes enhance_player_data adds
+    """
+    try:
+        stats = _get_enhancer_stats(player)
+    except KeyError:
+        # Fall back to the defaults for any missing stats
+        stats = [player.get(key, default) for key, default in _ENHANCER_STATS]
+    
+    # The derived attributes only depend on these stats, so repeat players reuse the result
+    return dict(_enhance_core(*stats))
+
+@lru_cache(maxsize=4096)
+def _enhance_core(fg_pct, tp_pct, ft_pct, points, assists, rebounds, minutes, true_shooting, position, height):
+    """Calculate the derived attributes from hashable stats, as (key, value) pairs in the order they are added."""
+    code = position_code(position)
+    derived = derive_attributes(
+        float(fg_pct), float(tp_pct), float(ft_pct), float(points), float(assists),
+        np.nan if rebounds is None else float(rebounds), float(minutes), float(true_shooting), code,
+    )
+    # Convert height to inches for easier comparison
+    return (('height_inches', parse_height(height)),) + tuple(
+        (_KERNEL_OUTPUTS[j], derived[j]) for j in _OUTPUT_ORDER[code])
+
+@njit(cache=True)
+def derive_attributes(fg_pct, tp_pct, ft_pct, points, assists, rebounds, minutes, true_shooting, position):
+    """
+    Calculate a player's numeric derived attributes.
+    
+    Args:
+        fg_pct, tp_pct, ft_pct: Shooting percentages
+        points, assists, rebounds: Per-game averages; rebounds is NaN if unknown
+        minutes: Average minutes per game
+        true_shooting: True shooting percentage
+        position: Position code (POS_BIG, POS_GUARD or POS_WING)
+        
+    Returns:
+        Tuple of floats in _KERNEL_OUTPUTS order
+    """
     # Calculate scoring efficiency (composite of shooting percentages)
-    enhanced_player['scoring_efficiency'] = (
-        player.get('Field Goal Percentage (FG%)', 45) * 0.5 +
-        player.get('Three-Point Percentage (3P%)', 33) * 0.3 +
-        player.get('Free Throw Percentage (FT%)', 75) * 0.2
+    scoring_efficiency = (
+        fg_pct * _SCORING_WEIGHTS[0] +
+        tp_pct * _SCORING_WEIGHTS[1] +
+        ft_pct * _SCORING_WEIGHTS[2]
     )
     
     # Estimate usage rate based on points and assists
-    enhanced_player['usage_rate'] = min(100, (
-        player.get('points', 10) * 2 + 
-        player.get('assists', 3) * 1.5
+    usage_rate = min(float(_MAX_USAGE_RATE), (
+        points * _USAGE_WEIGHTS[0] + 
+        assists * _USAGE_WEIGHTS[1]
     ))
     
-    # Position-based defensive estimates
-    position = player.get('position', 'SF')
-    if any(pos in position for pos in ['C', 'PF']):
-        # Big men tend to block more shots but get fewer steals
-        enhanced_player['estimated_blocks'] = 1.2 + (player.get('rebounds', 5) * 0.1)
-        enhanced_player['estimated_steals'] = 0.8
-        # Estimate offensive vs defensive rebounds
-        enhanced_player['offensive_rebounds'] = player.get('rebounds', 5) * 0.35
-        enhanced_player['defensive_rebounds'] = player.get('rebounds', 5) * 0.65
-    elif any(pos in position for pos in ['PG', 'SG']):
-        # Guards tend to get more steals but fewer blocks
-        enhanced_player['estimated_steals'] = 1.2 + (player.get('assists', 3) * 0.1)
-        enhanced_player['estimated_blocks'] = 0.3
-        # Guards get fewer offensive rebounds
-        enhanced_player['offensive_rebounds'] = player.get('rebounds', 3) * 0.2
-        enhanced_player['defensive_rebounds'] = player.get('rebounds', 3) * 0.8
-    else:
-        # Small forwards are balanced
-        enhanced_player['estimated_steals'] = 1.0
-        enhanced_player['estimated_blocks'] = 0.7
-        enhanced_player['offensive_rebounds'] = player.get('rebounds', 4) * 0.25
-        enhanced_player['defensive_rebounds'] = player.get('rebounds', 4) * 0.75
+    # Position-based defensive estimates, from the factors for the player's position
+    (default_rebounds, blocks_base, blocks_per_rebound, steals_base, steals_per_assist,
+     offensive_share, defensive_share) = _POSITION_FACTORS[position]
+    has_rebounds = not np.isnan(rebounds)
+    position_rebounds = rebounds if has_rebounds else default_rebounds
+    estimated_blocks = blocks_base + (position_rebounds * blocks_per_rebound)
+    estimated_steals = steals_base + (assists * steals_per_assist)
+    # Estimate offensive vs defensive rebounds
+    offensive_rebounds = position_rebounds * offensive_share
+    defensive_rebounds = position_rebounds * defensive_share
     
     # Calculate stamina factor based on minutes per game
-    enhanced_player['stamina'] = 0.9 + (
-        player.get('Average Minutes Per Game (MPG)', 25) / 40
-    ) * 0.2
+    stamina = _STAMINA_BASE + (minutes / _FULL_MINUTES) * _STAMINA_RANGE
     
     # Estimate clutch performance (based on FT% and TS%)
-    enhanced_player['clutch_rating'] = (
-        player.get('Free Throw Percentage (FT%)', 75) * 0.6 +
-        player.get('True Shooting Percentage (TS%)', 55) * 0.4
-    ) / 100
+    clutch_rating = (ft_pct * _CLUTCH_WEIGHTS[0] + true_shooting * _CLUTCH_WEIGHTS[1]) / 100
     
     # Estimate shot distribution (2PT vs 3PT tendency)
-    fg_pct = player.get('Field Goal Percentage (FG%)', 45)
-    tp_pct = player.get('Three-Point Percentage (3P%)', 33)
-    
     # If 3P% is close to FG%, player likely takes more 3s
-    if (fg_pct - tp_pct) < 8:
-        enhanced_player['three_point_tendency'] = 0.6  # 60% of shots are 3s
-    elif (fg_pct - tp_pct) < 15:
-        enhanced_player['three_point_tendency'] = 0.4  # 40% of shots are 3s
+    shooting_gap = fg_pct - tp_pct
+    if shooting_gap < _THREE_POINT_GAPS[0]:
+        three_point_tendency = _THREE_POINT_TENDENCIES[0]
+    elif shooting_gap < _THREE_POINT_GAPS[1]:
+        three_point_tendency = _THREE_POINT_TENDENCIES[1]
     else:
-        enhanced_player['three_point_tendency'] = 0.2  # 20% of shots are 3s
+        three_point_tendency = _THREE_POINT_TENDENCIES[2]
     
     # Estimate defensive impact based on position and rebounds
-    enhanced_player['defensive_impact'] = (
-        player.get('rebounds', 5) * 0.5 +
-        enhanced_player['estimated_blocks'] * 2 +
-        enhanced_player['estimated_steals'] * 1.5
-    ) / 10
+    defensive_impact = (
+        (rebounds if has_rebounds else _DEFAULT_REBOUNDS) * _DEFENSIVE_IMPACT_WEIGHTS[0] +
+        estimated_blocks * _DEFENSIVE_IMPACT_WEIGHTS[1] +
+        estimated_steals * _DEFENSIVE_IMPACT_WEIGHTS[2]
+    ) / _DEFENSIVE_IMPACT_SCALE
+    
+    return (
+        scoring_efficiency, usage_rate, estimated_blocks, estimated_steals,
+        offensive_rebounds, defensive_rebounds, stamina, clutch_rating, three_point_tendency,
+        defensive_impact,
+    )
+
+@njit(parallel=True, cache=True)
+def enhance_kernel(stats, positions):
+    """
+    Compute the numeric derived attributes for many players.
+    
+    Args:
+        stats: (n_players, 8) float array with columns in _KERNEL_INPUTS order
+        positions: Position code of each player
+        
+    Returns:
+        (n_players, 10) float array with columns in _KERNEL_OUTPUTS order
+    """
+    n = stats.shape[0]
+    out = np.empty((n, 10))
+    for i in prange(n):
+        derived = derive_attributes(
+            stats[i, FG], stats[i, TP], stats[i, FT], stats[i, POINTS], stats[i, ASSISTS],
+            stats[i, REBOUNDS], stats[i, MPG], stats[i, TS], positions[i]
+        )
+        for j in range(10):
+            out[i, j] = derived[j]
+    return out
+
+def enhance_players(players):
+    """
+    Enhance a whole roster at once.
+    
+    The player stats are packed into an array in one pass and the derived attributes
+    computed by the compiled enhance_kernel, giving the same values as enhance_player_data.
+    
+    Args:
+        players: List of dictionaries containing player stats
+        
+    Returns:
+        List of enhanced player dictionaries, in the same order
+    """
+    stats = np.array([[player.get(key, default) for key, default in _KERNEL_INPUTS] for player in players],
+                     dtype=float).reshape(len(players), len(_KERNEL_INPUTS))
+    positions = np.array([position_code(player.get('position', 'SF')) for player in players], dtype=np.int64)
+    derived = enhance_kernel(stats, positions).tolist()
     
-    return enhanced_player
+    # Attach the results to a copy of each player, in enhance_player_data's key order
+    enhanced_players = []
+    for player, code, row in zip(players, positions.tolist(), derived):
+        enhanced_player = player.copy()
+        enhanced_player['height_inches'] = parse_height(player.get('height', '6\'0"'))
+        enhanced_player.update((_KERNEL_OUTPUTS[j], row[j]) for j in _OUTPUT_ORDER[code])
+        enhanced_players.append(enhanced_player)
+    return enhanced_players
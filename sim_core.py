@@ -0,0 +1,434 @@
+"""
+Simulation Core Module
+
+This module holds the numeric core of the 1-on-1 simulation, compiled with
+Numba when it is installed. Without Numba, the game loops are replaced by
+plain-Python versions that work on lists and floats, which is much faster
+than running the array-based kernels uncompiled. The core works on the
+per-matchup stats array built by BasketballSimulator and records each
+possession as a row of integer event codes; turning those events into
+play-by-play text is left to the caller.
+"""
+
+import random
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Without Numba the kernels run as plain Python, so there is no extra
+    # dependency and no JIT compile on first use
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+    
+    prange = range
+    NUMBA_AVAILABLE = False
+
+# Column layout of the stats array, which holds one row of numbers per player
+(FG_PCT, THREE_PT_PCT, THREE_PT_TENDENCY, HEIGHT, OFF_RATING, DEF_RATING,
+ BLOCKS, STEALS, TURNOVERS, STAMINA, INSIDE_ODDS, OFF_REBOUNDS, DEF_REBOUNDS, CLUTCH) = range(14)
+N_FEATURES = 14
+
+# Safety limit on possessions per game
+MAX_POSSESSIONS = 100
+
+# Event codes and the columns of an event row
+EVT_TURNOVER, EVT_SHOT_MADE, EVT_SHOT_MISSED, EVT_STEAL, EVT_BLOCK = range(5)
+EVENT_KIND, EVENT_OFFENSE, EVENT_OUTSIDE = range(3)
+
+
+@njit(cache=True)
+def shot_success_probability(stats, off_idx, def_idx, inside):
+    """
+    Calculate the probability of a successful shot.
+    
+    Args:
+        stats: Per-player stats array
+        off_idx: Row of the player taking the shot
+        def_idx: Row of the player defending
+        inside: True for an inside (1-point) shot, False for an outside (2-point) shot
+    
+    Returns:
+        Float representing probability (0-1) of shot success
+    """
+    # Base probability from shooting percentages and derived stats
+    if inside:
+        # Inside shots use FG% as base, adjusted for height advantage/disadvantage
+        height_factor = 1 + (stats[off_idx, HEIGHT] - stats[def_idx, HEIGHT]) / 100
+        base_probability = stats[off_idx, FG_PCT] / 100 * height_factor
+        # Adjust for defensive impact specifically for this shot type
+        defense_impact = stats[def_idx, BLOCKS] * 0.05
+    else:
+        # Outside shots use 3P% as base; players who take more threes
+        # tend to be better at them in game situations
+        base_probability = stats[off_idx, THREE_PT_PCT] / 100 + stats[off_idx, THREE_PT_TENDENCY] * 0.1
+        defense_impact = stats[def_idx, STEALS] * 0.03
+    
+    # Adjust for offensive vs defensive ratings
+    rating_factor = 1 + (stats[off_idx, OFF_RATING] - stats[def_idx, DEF_RATING]) / 200
+    
+    # Calculate final probability, clamped to a reasonable range
+    final_probability = base_probability * rating_factor - defense_impact
+    return max(0.1, min(0.9, final_probability))
+
+
+@njit(cache=True)
+def shot_probability_table(stats):
+    """
+    Calculate every shot probability a matchup can need.
+    
+    Args:
+        stats: Per-player stats array (2 x N_FEATURES)
+    
+    Returns:
+        2 x 2 array indexed by [row of the shooter, 1 for an inside shot else 0];
+        the other row is the defender
+    """
+    table = np.empty((2, 2))
+    for off_idx in range(2):
+        table[off_idx, 0] = shot_success_probability(stats, off_idx, 1 - off_idx, False)
+        table[off_idx, 1] = shot_success_probability(stats, off_idx, 1 - off_idx, True)
+    return table
+
+
+@njit(cache=True)
+def _play_game(stats, shot_probs, target_score, make_it_take_it, events, score):
+    """Play one game, writing a row to events per possession and the final score to score. Returns (n_events, first_offense)."""
+    fatigue = np.zeros(2)
+    
+    # Determine who starts with the ball (50/50 chance)
+    offense = 0 if np.random.random() < 0.5 else 1
+    first_offense = offense
+    
+    n_events = 0
+    while max(score[0], score[1]) < target_score and n_events < MAX_POSSESSIONS:
+        off_idx = offense
+        def_idx = 1 - offense
+        events[n_events, EVENT_OFFENSE] = off_idx
+        
+        # Apply fatigue effects (players get tired as game progresses)
+        fatigue_factor = 1.0 - fatigue[off_idx] * 0.01 * (1.0 / stats[off_idx, STAMINA])
+        
+        # Determine if there's a turnover
+        if np.random.random() < 0.05 + stats[off_idx, TURNOVERS] / 40:
+            events[n_events, EVENT_KIND] = EVT_TURNOVER
+            events[n_events, EVENT_OUTSIDE] = 0
+            n_events += 1
+            offense = def_idx
+            continue
+        
+        # Determine shot type and whether it goes in
+        inside = np.random.random() < stats[off_idx, INSIDE_ODDS]
+        success_prob = shot_probs[off_idx, 1 if inside else 0] * fatigue_factor
+        made = np.random.random() < success_prob
+        events[n_events, EVENT_KIND] = EVT_SHOT_MADE if made else EVT_SHOT_MISSED
+        events[n_events, EVENT_OUTSIDE] = 0 if inside else 1
+        n_events += 1
+        
+        if made:
+            score[off_idx] += 1 if inside else 2
+            # First to the target wins outright (there is no win-by-2 rule), so the game
+            # stops on the winning basket rather than playing out further possessions
+            if score[off_idx] >= target_score:
+                break
+            if not make_it_take_it:
+                offense = def_idx
+        else:
+            # Shot missed, defensive player gets rebound
+            offense = def_idx
+        
+        # Increase fatigue
+        fatigue[off_idx] += 0.5
+        fatigue[def_idx] += 0.3
+    
+    return n_events, first_offense
+
+
+@njit(cache=True)
+def seed(value):
+    """Seed the random draws made by the kernels on the current thread."""
+    np.random.seed(value)
+
+
+@njit(cache=True)
+def possession_tables(stats):
+    """
+    Calculate the matchup-fixed chances used by play_possession.
+    
+    Args:
+        stats: Per-player stats array (2 x N_FEATURES)
+    
+    Returns:
+        Tuple of 2 x 2 arrays: turnover_probs[shooter] holds the (unforced turnover, steal)
+        chances, block_probs[defender, 1 if inside else 0] the chance of a block,
+        rebound_probs[shooter, 1 if inside else 0] the chance of an offensive rebound and
+        shot_factors[shooter] the (clutch, stamina) multipliers for shot success
+    """
+    turnover_probs = np.empty((2, 2))
+    block_probs = np.empty((2, 2))
+    rebound_probs = np.empty((2, 2))
+    shot_factors = np.empty((2, 2))
+    for off_idx in range(2):
+        def_idx = 1 - off_idx
+        turnover_probs[off_idx, 0] = stats[off_idx, TURNOVERS] / 15
+        turnover_probs[off_idx, 1] = stats[def_idx, STEALS] / 10
+        
+        # Outside shots tend to have longer rebounds; height helps either way
+        off_rebounds = stats[off_idx, OFF_REBOUNDS]
+        height_advantage = (stats[off_idx, HEIGHT] - stats[def_idx, HEIGHT]) / 100
+        outside_chance = off_rebounds / (off_rebounds + stats[def_idx, DEF_REBOUNDS] * 1.2) + height_advantage
+        inside_chance = off_rebounds / (off_rebounds + stats[def_idx, DEF_REBOUNDS]) + height_advantage
+        rebound_probs[off_idx, 0] = max(0.2, min(0.8, outside_chance))
+        rebound_probs[off_idx, 1] = max(0.2, min(0.8, inside_chance))
+        
+        shot_factors[off_idx, 0] = 1 + stats[off_idx, CLUTCH] * 0.2
+        shot_factors[off_idx, 1] = 0.95 + stats[off_idx, STAMINA] * 0.1
+    
+    # Blocks are indexed by the defender: only inside shots can be blocked, more often by a taller defender
+    for defender in range(2):
+        shooter = 1 - defender
+        block_probs[defender, 0] = 0.0
+        block_probs[defender, 1] = stats[defender, BLOCKS] / 10 + max(stats[defender, HEIGHT] - stats[shooter, HEIGHT], 0) / 200
+    return turnover_probs, block_probs, rebound_probs, shot_factors
+
+
+@njit(cache=True)
+def play_possession(stats, shot_probs, turnover_probs, block_probs, rebound_probs, shot_factors,
+                    off_idx, score_off, score_def, target_score, make_it_take_it):
+    """
+    Play one possession of the detailed model (steals, blocks, clutch shooting and rebounds).
+    
+    Args:
+        stats: Per-player stats array (2 x N_FEATURES)
+        shot_probs: Shot probability table from shot_probability_table
+        turnover_probs, block_probs, rebound_probs, shot_factors: Tables from possession_tables
+        off_idx: Row of the player with the ball
+        score_off: Current score of the player with the ball
+        score_def: Current score of the defender
+        target_score: Points needed to win
+        make_it_take_it: If True, scorer keeps possession
+    
+    Returns:
+        Tuple of the event code, 1 if the shot was from outside (else 0) and the row of
+        the player who has the ball next
+    """
+    def_idx = 1 - off_idx
+    
+    # Determine if there's a turnover; the draw then also decides whether it was a steal
+    turnover_chance = turnover_probs[off_idx, 0]
+    steal_chance = turnover_probs[off_idx, 1]
+    turnover_draw = np.random.random()
+    if turnover_draw < turnover_chance + steal_chance:
+        return (EVT_STEAL if turnover_draw < steal_chance else EVT_TURNOVER), 0, def_idx
+    
+    # Determine shot type and whether it is blocked
+    outside = 1 if np.random.random() < stats[off_idx, THREE_PT_TENDENCY] else 0
+    if np.random.random() < block_probs[def_idx, 1 - outside]:
+        # 50% chance the blocker gains possession, otherwise ball stays with shooter
+        return EVT_BLOCK, outside, (def_idx if np.random.random() < 0.5 else off_idx)
+    
+    success_prob = shot_probs[off_idx, 1 - outside]
+    
+    # Adjust for clutch situations (close game in late stages)
+    score_diff = score_off - score_def
+    leading_score = score_off if score_diff > 0 else score_def
+    if -2 <= score_diff <= 2 and leading_score >= target_score - 3:
+        success_prob = success_prob * shot_factors[off_idx, 0]
+    
+    # Adjust for stamina
+    success_prob = success_prob * shot_factors[off_idx, 1]
+    
+    shot_draw = np.random.random()
+    if shot_draw < success_prob:
+        return EVT_SHOT_MADE, outside, (off_idx if make_it_take_it else def_idx)
+    
+    # Shot missed; a miss leaves the shot draw uniform over [success_prob, 1), so rescale
+    # and reuse it to decide the rebound
+    rebound_draw = (shot_draw - success_prob) / (1 - success_prob)
+    return EVT_SHOT_MISSED, outside, (off_idx if rebound_draw < rebound_probs[off_idx, 1 - outside] else def_idx)
+
+
+@njit(cache=True)
+def run_game(stats, target_score, make_it_take_it, seed):
+    """
+    Simulate one game.
+    
+    Args:
+        stats: Per-player stats array (2 x N_FEATURES)
+        target_score: Points needed to win
+        make_it_take_it: If True, scorer keeps possession
+        seed: Seed for the random draws
+    
+    Returns:
+        Tuple of the event rows (one per possession) and the index of the player
+        who won the tip
+    """
+    np.random.seed(seed)
+    events = np.empty((MAX_POSSESSIONS, 3), dtype=np.int32)
+    score = np.zeros(2, dtype=np.int64)
+    n_events, first_offense = _play_game(stats, shot_probability_table(stats), target_score, make_it_take_it, events, score)
+    return events[:n_events], first_offense
+
+
+@njit(parallel=True, cache=True)
+def run_games(stats, target_score, make_it_take_it, n_games, seeds):
+    """
+    Simulate many independent games, spread across all cores.
+    
+    Args:
+        stats: Per-player stats array (2 x N_FEATURES)
+        target_score: Points needed to win
+        make_it_take_it: If True, scorer keeps possession
+        n_games: Number of games to simulate
+        seeds: One seed per game, so results don't depend on thread scheduling
+    
+    Returns:
+        Tuple of the final scores (n_games x 2), the event rows of every game
+        (n_games x MAX_POSSESSIONS x 3) and the number of events in each game
+    """
+    scores = np.zeros((n_games, 2), dtype=np.int64)
+    events = np.empty((n_games, MAX_POSSESSIONS, 3), dtype=np.int32)
+    n_events = np.empty(n_games, dtype=np.int64)
+    shot_probs = shot_probability_table(stats)
+    for g in prange(n_games):
+        # Numba keeps a separate random state per thread, so seeding here only
+        # affects the game being played on this thread
+        np.random.seed(seeds[g])
+        n_events[g], _ = _play_game(stats, shot_probs, target_score, make_it_take_it, events[g], scores[g])
+    return scores, events, n_events
+
+
+@njit(parallel=True, cache=True)
+def run_games_scores(stats, target_score, make_it_take_it, n_games, seeds):
+    """
+    Simulate many independent games like run_games, keeping only the final scores.
+    
+    Each game records its events in a scratch buffer that is dropped afterwards, so
+    memory stays at the n_games x 2 scores even for millions of games.
+    
+    Args:
+        stats: Per-player stats array (2 x N_FEATURES)
+        target_score: Points needed to win
+        make_it_take_it: If True, scorer keeps possession
+        n_games: Number of games to simulate
+        seeds: One seed per game, so results don't depend on thread scheduling
+    
+    Returns:
+        The final scores (n_games x 2), the same as run_games gives for these seeds
+    """
+    scores = np.zeros((n_games, 2), dtype=np.int64)
+    shot_probs = shot_probability_table(stats)
+    for g in prange(n_games):
+        np.random.seed(seeds[g])
+        events = np.empty((MAX_POSSESSIONS, 3), dtype=np.int32)
+        _play_game(stats, shot_probs, target_score, make_it_take_it, events, scores[g])
+    return scores
+
+
+def _play_game_py(stats, shot_probs, target_score, make_it_take_it, rng):
+    """
+    Plain-Python version of _play_game, for when Numba isn't installed.
+    
+    Indexing NumPy arrays one element at a time is slow in the interpreter, so this
+    reads the stats and shot probabilities as nested lists and draws from a
+    random.Random. The game rules match _play_game exactly.
+    
+    Returns:
+        Tuple of the event rows (a list of (kind, offense, outside) tuples), the final
+        score as a list and the index of the player who won the tip
+    """
+    draw = rng.random
+    # Only the columns the loop needs, one entry per player
+    turnover_chance = [0.05 + row[TURNOVERS] / 40 for row in stats]
+    inside_odds = [row[INSIDE_ODDS] for row in stats]
+    stamina_scale = [0.01 * (1.0 / row[STAMINA]) for row in stats]
+    fatigue = [0.0, 0.0]
+    score = [0, 0]
+    events = []
+    
+    # Determine who starts with the ball (50/50 chance)
+    offense = 0 if draw() < 0.5 else 1
+    first_offense = offense
+    
+    while len(events) < MAX_POSSESSIONS:
+        off_idx = offense
+        def_idx = 1 - offense
+        
+        # Apply fatigue effects (players get tired as game progresses)
+        fatigue_factor = 1.0 - fatigue[off_idx] * stamina_scale[off_idx]
+        
+        # Determine if there's a turnover
+        if draw() < turnover_chance[off_idx]:
+            events.append((EVT_TURNOVER, off_idx, 0))
+            offense = def_idx
+            continue
+        
+        # Determine shot type and whether it goes in
+        inside = draw() < inside_odds[off_idx]
+        made = draw() < shot_probs[off_idx][1 if inside else 0] * fatigue_factor
+        events.append((EVT_SHOT_MADE if made else EVT_SHOT_MISSED, off_idx, 0 if inside else 1))
+        
+        if made:
+            score[off_idx] += 1 if inside else 2
+            # First to the target wins outright (there is no win-by-2 rule)
+            if score[off_idx] >= target_score:
+                break
+            if not make_it_take_it:
+                offense = def_idx
+        else:
+            # Shot missed, defensive player gets rebound
+            offense = def_idx
+        
+        # Increase fatigue
+        fatigue[off_idx] += 0.5
+        fatigue[def_idx] += 0.3
+    
+    return events, score, first_offense
+
+
+def _event_array(events):
+    """Pack event tuples into the (n_events, 3) int32 array the kernels return."""
+    return np.array(events, dtype=np.int32).reshape(len(events), 3)
+
+
+@lru_cache(maxsize=64)
+def _python_tables(stats_bytes):
+    """Stats rows and shot probabilities as nested lists, cached per matchup (keyed by the stats' bytes)."""
+    stats = np.frombuffer(stats_bytes).reshape(2, N_FEATURES)
+    return stats.tolist(), shot_probability_table(stats).tolist()
+
+
+if not NUMBA_AVAILABLE:
+    def run_game(stats, target_score, make_it_take_it, seed):
+        """Plain-Python run_game, used when Numba isn't installed."""
+        rows, shot_probs = _python_tables(stats.tobytes())
+        events, _, first_offense = _play_game_py(rows, shot_probs, target_score, make_it_take_it,
+                                                 random.Random(seed))
+        return _event_array(events), first_offense
+    
+    def run_games(stats, target_score, make_it_take_it, n_games, seeds):
+        """Plain-Python run_games, used when Numba isn't installed."""
+        rows, shot_probs = _python_tables(stats.tobytes())
+        scores = np.zeros((n_games, 2), dtype=np.int64)
+        events = np.empty((n_games, MAX_POSSESSIONS, 3), dtype=np.int32)
+        n_events = np.empty(n_games, dtype=np.int64)
+        for g in range(n_games):
+            game_events, scores[g], _ = _play_game_py(rows, shot_probs, target_score, make_it_take_it,
+                                                      random.Random(int(seeds[g])))
+            n_events[g] = len(game_events)
+            events[g, :len(game_events)] = _event_array(game_events)
+        return scores, events, n_events
+    
+    def run_games_scores(stats, target_score, make_it_take_it, n_games, seeds):
+        """Plain-Python run_games_scores, used when Numba isn't installed."""
+        rows, shot_probs = _python_tables(stats.tobytes())
+        scores = np.zeros((n_games, 2), dtype=np.int64)
+        for g in range(n_games):
+            _, scores[g], _ = _play_game_py(rows, shot_probs, target_score, make_it_take_it,
+                                            random.Random(int(seeds[g])))
+        return scores
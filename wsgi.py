@@ -0,0 +1,13 @@
+# WSGI entry point for NBA Player Stat Viewer & Simulator
+#
+# Run with a production server instead of the Flask dev server, e.g.:
+#
+#     gunicorn -w 1 --threads 8 wsgi:application
+#
+# Use a single worker process: simulation jobs from /api/simulate are kept in that
+# process's memory, so every poll of /api/simulate/<job_id> has to reach it. The
+# threads serve concurrent requests, and the simulations run on app.py's thread pool.
+
+from app import app
+
+application = app